@@ -0,0 +1,81 @@
+# ====================================
+# 🚨 ALERTAS DE VALIDADE
+# ====================================
+# Cálculo vetorizado dos dias até o vencimento, com um índice ordenado
+# por data de validade: "vence em até N dias" e "vencidos" viram buscas
+# binárias em vez de varrer a tabela linha a linha.
+# ====================================
+
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Alerta:
+    produto: str
+    cor: str
+    dias: int
+
+    @property
+    def vencido(self):
+        return self.dias < 0
+
+    def texto(self):
+        if self.vencido:
+            return f"❌ {self.produto} ({self.cor}) VENCIDO!"
+        return f"⚠️ {self.produto} ({self.cor}) vence em {self.dias} dia(s)"
+
+
+class IndiceValidade:
+    """Lotes ordenados por data de validade, com consultas por faixa de dias"""
+
+    def __init__(self, df):
+        if "data_validade" not in df.columns:
+            df = df.assign(data_validade=pd.Series(dtype="object"))
+        validade = pd.to_datetime(df["data_validade"], errors="coerce").dt.normalize()
+        # Lotes sem validade ficam de fora do índice
+        validos = validade.notna().to_numpy()
+        ordem = np.argsort(validade.to_numpy()[validos], kind="stable")
+        self.df = df[validos].iloc[ordem].assign(data_validade=validade[validos].iloc[ordem])
+        self._validades = pd.DatetimeIndex(self.df["data_validade"])
+
+    def memoria(self):
+        """Bytes ocupados (entra no limite de memória do CacheTabelas)"""
+        return int(self.df.memory_usage(deep=True).sum()) + self._validades.nbytes
+
+    def entre(self, min_dias=None, max_dias=None, hoje=None):
+        """Lotes com min_dias <= dias para vencer <= max_dias (None = sem limite), com a coluna "dias" """
+        hoje = pd.Timestamp(hoje or datetime.now().date())
+        ini = 0 if min_dias is None else self._validades.searchsorted(
+            hoje + pd.Timedelta(days=min_dias), side="left")
+        fim = len(self._validades) if max_dias is None else self._validades.searchsorted(
+            hoje + pd.Timedelta(days=max_dias), side="right")
+        faixa = self.df.iloc[ini:fim]
+        return faixa.assign(dias=(faixa["data_validade"] - hoje).dt.days.astype("int64"))
+
+    def vencendo(self, dias=2, hoje=None):
+        return self.entre(0, dias, hoje)
+
+    def vencidos(self, hoje=None):
+        return self.entre(None, -1, hoje)
+
+
+def gerar_alertas(indice, dias=2, limite=None, hoje=None):
+    """Retorna (alertas, total): registros estruturados, montados só para os `limite` primeiros"""
+    if indice.df.empty:
+        return [], 0
+    vencendo = indice.vencendo(dias, hoje)
+    vencidos = indice.vencidos(hoje)
+    total = len(vencendo) + len(vencidos)
+    alertas = []
+    for faixa in (vencendo, vencidos):
+        if limite is not None:
+            faixa = faixa.head(max(limite - len(alertas), 0))
+        alertas.extend(
+            Alerta(produto, cor, int(dias_))
+            for produto, cor, dias_ in zip(faixa["produto"], faixa["cor"], faixa["dias"])
+        )
+    return alertas, total
@@ -0,0 +1,114 @@
+# ====================================
+# 📉 ANÁLISES DE DESPERDÍCIO
+# ====================================
+# Tendências calculadas sobre os resumos diários (resumo_diario e
+# resumo_motivos, mantidos por triggers em sql/*/004_resumos.sql):
+# um ano de histórico são algumas centenas de linhas por produto,
+# em vez de todas as linhas de produção e desperdício.
+# ====================================
+
+import pandas as pd
+
+from registros import CORES
+
+# rótulo na tela -> frequência do pandas
+FREQUENCIAS = {"Diário": "D", "Semanal": "W-MON", "Mensal": "MS"}
+QUANTIDADES = ["quantidade_produzida", "quantidade_desperdicada"]
+SEM_MOTIVO = "(sem motivo)"
+
+
+def _com_taxa(df):
+    # Taxa em % do produzido; sem produção no grupo a taxa fica nula
+    produzida = df["quantidade_produzida"].where(df["quantidade_produzida"] > 0)
+    return df.assign(**{"taxa_%": (df["quantidade_desperdicada"] / produzida * 100).round(2)})
+
+
+def serie_periodo(resumo, frequencia="D", janela=7):
+    """Produzido, desperdiçado e taxa (%) por período, com a taxa móvel das últimas `janela` linhas
+
+    A média móvel divide as somas da janela (e não a média das taxas), para
+    dias de pouca produção não pesarem como dias cheios.
+    """
+    if resumo.empty:
+        return pd.DataFrame(columns=[*QUANTIDADES, "taxa_%", "taxa_móvel_%"])
+    # Períodos sem movimento entram com zero
+    serie = resumo.groupby(pd.Grouper(key="data", freq=frequencia, label="left", closed="left"))[QUANTIDADES].sum()
+    moveis = serie.rolling(janela, min_periods=1).sum()
+    return _com_taxa(serie).assign(**{"taxa_móvel_%": _com_taxa(moveis)["taxa_%"]})
+
+
+def por_grupo(resumo, coluna):
+    """Totais e taxa por produto, cor ou motivo, do maior desperdício para o menor"""
+    if resumo.empty:
+        return pd.DataFrame(columns=[coluna, *QUANTIDADES, "taxa_%"])
+    totais = resumo.groupby(coluna, observed=True, as_index=False)[QUANTIDADES].sum()
+    return _com_taxa(totais).sort_values("quantidade_desperdicada", ascending=False, ignore_index=True)
+
+
+def por_cor(resumo):
+    """Totais por cor do dia, na ordem da semana (segunda = azul)"""
+    totais = por_grupo(resumo, "cor")
+    ordem = {cor: i for i, cor in enumerate(CORES)}
+    return totais.sort_values("cor", key=lambda s: s.astype(object).map(ordem), ignore_index=True)
+
+
+def piores_produtos(resumo, n=10, minimo_produzido=1):
+    """Os `n` produtos com maior taxa de desperdício (ignorando os que produziram menos que o mínimo)"""
+    totais = por_grupo(resumo, "produto")
+    totais = totais[totais["quantidade_produzida"] >= minimo_produzido]
+    return totais.sort_values(["taxa_%", "quantidade_desperdicada"], ascending=False, ignore_index=True).head(n)
+
+
+def por_motivo(motivos):
+    """Quantidade desperdiçada por motivo, do maior para o menor"""
+    if motivos.empty:
+        return pd.DataFrame(columns=["motivo", "quantidade_desperdicada"])
+    totais = (
+        motivos.assign(motivo=motivos["motivo"].astype(object).replace("", SEM_MOTIVO).fillna(SEM_MOTIVO))
+        .groupby("motivo", as_index=False)["quantidade_desperdicada"].sum()
+    )
+    return totais.sort_values("quantidade_desperdicada", ascending=False, ignore_index=True)
+
+
+def taxa_por_produto(resumo, produtos, frequencia="W-MON"):
+    """Taxa (%) por período, uma coluna por produto escolhido"""
+    escolhidos = resumo[resumo["produto"].isin(produtos)]
+    if escolhidos.empty:
+        return pd.DataFrame()
+    totais = escolhidos.groupby(
+        [pd.Grouper(key="data", freq=frequencia, label="left", closed="left"), "produto"], observed=True
+    )[QUANTIDADES].sum()
+    return _com_taxa(totais)["taxa_%"].unstack("produto")
+
+
+def calcular_resumos(producao, desperdicio):
+    """resumo_diario e resumo_motivos em memória (mesma regra do sql/*/004_resumos.sql), para backends sem triggers"""
+    partes = []
+    if not producao.empty:
+        partes.append(pd.DataFrame({
+            "data": pd.to_datetime(producao["data_producao"], errors="coerce").dt.strftime("%Y-%m-%d"),
+            "produto": producao["produto"], "cor": producao["cor"],
+            "quantidade_produzida": producao["quantidade_produzida"], "quantidade_desperdicada": 0,
+        }))
+    if not desperdicio.empty:
+        partes.append(pd.DataFrame({
+            "data": pd.to_datetime(desperdicio["data_desperdicio"], errors="coerce").dt.strftime("%Y-%m-%d"),
+            "produto": desperdicio["produto"], "cor": desperdicio["cor"], "motivo": desperdicio["motivo"],
+            "quantidade_produzida": 0, "quantidade_desperdicada": desperdicio["quantidade_desperdicada"],
+        }))
+    colunas_diario = ["id", "data", "produto", "cor", *QUANTIDADES]
+    colunas_motivos = ["id", "data", "produto", "motivo", "quantidade_desperdicada"]
+    if not partes:
+        return pd.DataFrame(columns=colunas_diario), pd.DataFrame(columns=colunas_motivos)
+
+    linhas = pd.concat(partes, ignore_index=True).dropna(subset=["data"])
+    linhas = linhas.fillna({"produto": "", "cor": "", "motivo": "", **{q: 0 for q in QUANTIDADES}})
+    diario = linhas.groupby(["data", "produto", "cor"], as_index=False)[QUANTIDADES].sum()
+    motivos = (
+        linhas[linhas["quantidade_desperdicada"] != 0]
+        .groupby(["data", "produto", "motivo"], as_index=False)["quantidade_desperdicada"].sum()
+    )
+    # id sequencial: as tabelas são lidas com paginação por id
+    diario.insert(0, "id", range(1, len(diario) + 1))
+    motivos.insert(0, "id", range(1, len(motivos) + 1))
+    return diario[colunas_diario], motivos[colunas_motivos]
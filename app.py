@@ -6,33 +6,140 @@
 # ✅ Recursos:
 # - Todas as abas completas e funcionais
 # - json_safe() corrige serialização Supabase
-# - Relatórios com filtro + exportar CSV/Excel
+# - Relatórios com filtro + exportar CSV/Excel/Parquet (em páginas)
 # - Nova aba 🧹 Zerar Sistema (apenas admin)
 # ====================================
 
 import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 from datetime import datetime, timedelta
-from supabase import create_client, Client
-from io import BytesIO
-import bcrypt
+import tempfile
+from itertools import chain
+from pathlib import Path
 import numpy as np
+from repositorio import Repositorio, criar_repositorio
+from dados import (CacheTabelas, COLUNAS_RELATORIO, buscar_periodo, concatenar, filtros_periodo, inserir_em_lotes,
+                   iterar_paginas, nomes_produtos, registros_json)
+from alertas import IndiceValidade, gerar_alertas
+from arquivamento import ArquivoHistorico, RETENCAO_DIAS, arquivar_antigos, arquivar_tudo
+from analises import FREQUENCIAS, piores_produtos, por_cor, por_motivo, serie_periodo, taxa_por_produto
+from estoque import AlocadorFIFO
+from fila import FilaEscrita
+from precalculo import ler_manifesto
+from autenticacao import SessoesServidor, autenticar, buscar_usuario, hash_senha
+from desempenho import HistoricoDesempenho, RepositorioInstrumentado, etapa, rastro_atual
+from registros import montar_producao, validar_producao_em_lote
+from exportacao import FORMATOS, exportar
 
 # ====================================
 # CONFIGURAÇÃO
 # ====================================
 st.set_page_config(page_title="Controle de Produção e Desperdício", page_icon="🏭", layout="wide")
 
+MAX_ALERTAS_SIDEBAR = 30  # alertas exibidos na barra lateral (o restante vira um contador)
+# Tabelas que cada página lê; são buscadas em paralelo com a de alertas (producao) no início do rerun
+TABELAS_POR_PAGINA = {
+    "📊 Painel de Status": ["estoque_produtos"],
+    "📦 Estoque Atual": ["estoque_lotes"],
+    "Registrar Desperdício ⚠️": ["estoque_lotes"],
+    "♻️ Remarcar Produtos": ["estoque_lotes"],
+}
+
 # ====================================
-# CONEXÃO SUPABASE
+# CONEXÃO (SUPABASE / SQLITE / SHEETS)
 # ====================================
 @st.cache_resource
-def conectar_supabase() -> Client:
-    url = st.secrets["supabase"]["url"]
-    key = st.secrets["supabase"]["key"]
-    return create_client(url, key)
+def obter_repositorio() -> Repositorio:
+    # Configurável em secrets.toml: [armazenamento] backend = "supabase" | "sqlite" | "sheets"
+    config = dict(st.secrets.get("armazenamento", {}))
+    backend = config.get("backend", "supabase")
+    if backend == "sheets":
+        config["credenciais"] = st.secrets["connections"]["gsheets"]
+    elif backend == "supabase":
+        config.update(st.secrets["supabase"])
+    # Toda chamada ao banco entra no rastro de desempenho do rerun
+    return RepositorioInstrumentado(criar_repositorio(config))
+
+@st.cache_resource
+def obter_historico() -> HistoricoDesempenho:
+    # Configurável em secrets.toml: [desempenho] max_rastros = 2000, arquivo = "rastros.jsonl"
+    config = st.secrets.get("desempenho", {})
+    return HistoricoDesempenho(config.get("max_rastros", 2000), config.get("arquivo"))
+
+# Configurável em secrets.toml: [retencao] pasta = "arquivo", dias = 180
+CONFIG_RETENCAO = st.secrets.get("retencao", {})
+
+@st.cache_resource
+def obter_arquivo() -> ArquivoHistorico:
+    return ArquivoHistorico(CONFIG_RETENCAO.get("pasta", "arquivo"))
+
+def conexao_atual():
+    """Id da conexão (sessão do Streamlit) que está rodando o script, ou None"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+def conexao_ativa(id_conexao):
+    return Runtime.exists() and Runtime.instance().is_active_session(id_conexao)
+
+# Configurável em secrets.toml: [sessao] validade_horas = 12
+@st.cache_resource
+def obter_sessoes() -> SessoesServidor:
+    return SessoesServidor(st.secrets.get("sessao", {}).get("validade_horas", 12) * 3600, conexao_ativa)
+
+repo = obter_repositorio()
+historico = obter_historico()
+sessoes = obter_sessoes()
+arquivo_historico = obter_arquivo()
+
+# Configurável em secrets.toml: [cache] ttl = 60, max_mb = 256, timeout = 15 (segundos por leitura)
+CONFIG_CACHE = st.secrets.get("cache", {})
+
+@st.cache_resource
+def obter_cache() -> CacheTabelas:
+    return CacheTabelas(repo, ttl=CONFIG_CACHE.get("ttl", 60), max_mb=CONFIG_CACHE.get("max_mb", 256))
+
+cache = obter_cache()
+
+@st.cache_data(ttl=CONFIG_CACHE.get("ttl", 60), max_entries=32)
+def carregar_relatorio(tabela, campo_data, ini, fim, produtos):
+    colunas = COLUNAS_RELATORIO[tabela]
+    df = buscar_periodo(repo, tabela, campo_data, ini, fim, colunas, produtos)
+    # Período que chega em meses arquivados: junta as linhas do Parquet
+    antigos = arquivo_historico.ler_periodo(tabela, campo_data, ini, fim, colunas, produtos)
+    if antigos.empty:
+        return df
+    return concatenar(antigos, df).drop_duplicates(subset="id", keep="last").sort_values("id", ignore_index=True)
+
+@st.cache_data(ttl=CONFIG_CACHE.get("ttl", 60), max_entries=32)
+def carregar_resumos(ini, fim):
+    """Resumos diários do período (sql/*/004_resumos.sql): poucas linhas mesmo para um ano"""
+    return (
+        buscar_periodo(repo, "resumo_diario", "data", ini, fim),
+        buscar_periodo(repo, "resumo_motivos", "data", ini, fim),
+    )
+
+def invalidar(*tabelas):
+    """Chamar após qualquer escrita: vence os snapshots e os relatórios em cache"""
+    cache.invalidar(*tabelas)
+    carregar_relatorio.clear()
+    carregar_resumos.clear()
+
+# Artefatos gerados por precalculo.py: [artefatos] pasta = "artefatos", loja = "principal"
+CONFIG_ARTEFATOS = st.secrets.get("artefatos", {})
+PASTA_ARTEFATOS = Path(CONFIG_ARTEFATOS.get("pasta", "artefatos")) / CONFIG_ARTEFATOS.get("loja", "principal")
+
+# Configurável em secrets.toml: [fila] ativa = true, caminho = "fila_escrita.db"
+CONFIG_FILA = st.secrets.get("fila", {})
+
+@st.cache_resource
+def obter_fila() -> FilaEscrita:
+    # Cada lote confirmado no banco vence os snapshots da tabela
+    return FilaEscrita(repo, CONFIG_FILA.get("caminho", "fila_escrita.db"), ao_enviar=invalidar)
 
-supabase = conectar_supabase()
+# Sem a fila, os registros vão direto para o banco (e a tela espera a resposta)
+fila = obter_fila() if CONFIG_FILA.get("ativa", True) else None
 
 # ====================================
 # FUNÇÕES AUXILIARES
@@ -40,10 +147,6 @@ supabase = conectar_supabase()
 def agora_fmt():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def cor_do_dia(dia_semana):
-    cores = ["azul", "verde", "amarelo", "laranja", "vermelho", "prata", "dourado"]
-    return cores[dia_semana]
-
 def emoji_cor(cor):
     mapa = {
         "azul": "🟦", "verde": "🟩", "amarelo": "🟨", "laranja": "🟧",
@@ -51,31 +154,32 @@ def emoji_cor(cor):
     }
     return mapa.get(cor, "⬛")
 
-def hash_senha(senha):
-    return bcrypt.hashpw(senha.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+def mostrar_envios(tabela):
+    """Situação de envio dos últimos registros da tabela que passaram pela fila"""
+    if fila is None:
+        return
+    recentes = fila.recentes(tabela)
+    if not recentes.empty:
+        with st.expander("📤 Envios recentes"):
+            st.dataframe(recentes, hide_index=True)
+
+def indisponivel(falhas, *tabelas):
+    """True (com um aviso na página) se alguma tabela da seção falhou na leitura deste rerun
 
-def verificar_senha(senha_digitada, senha_hash):
-    try:
-        return bcrypt.checkpw(senha_digitada.encode("utf-8"), senha_hash.encode("utf-8"))
-    except Exception:
-        return False
-
-def gerar_alertas(df):
-    hoje = datetime.now().date()
-    df["data_validade"] = pd.to_datetime(df["data_validade"], errors="coerce")
-    df["dias"] = df["data_validade"].apply(lambda x: (x.date() - hoje).days if pd.notnull(x) else None)
-    vencendo = df[df["dias"].between(0, 2, inclusive="both")]
-    vencidos = df[df["dias"] < 0]
-    alertas = []
-    for _, row in vencendo.iterrows():
-        alertas.append(f"⚠️ {row['produto']} ({row['cor']}) vence em {row['dias']} dia(s)")
-    for _, row in vencidos.iterrows():
-        alertas.append(f"❌ {row['produto']} ({row['cor']}) VENCIDO!")
-    return alertas
+    Uma leitura que passou do timeout continua rodando e segura o lock da tabela:
+    a seção que depende dela é pulada em vez de esperar.
+    """
+    faltando = [t for t in tabelas if t in falhas]
+    if faltando:
+        st.warning(f"⚠️ Dados indisponíveis no momento ({', '.join(faltando)}). Tente novamente em instantes.")
+    return bool(faltando)
 
 # 🔧 Conversor universal
 def json_safe(value):
     """Converte tipos incompatíveis (numpy, timestamp, etc.) em JSON válido"""
+    if isinstance(value, pd.DataFrame):
+        # DataFrame inteiro: conversão vetorizada por coluna, retorna a lista de registros
+        return registros_json(value)
     if isinstance(value, (pd.Timestamp, datetime)):
         return value.strftime("%Y-%m-%d %H:%M:%S")
     if isinstance(value, (np.int64, np.int32, np.integer)):
@@ -96,13 +200,12 @@ def login_page():
     st.title("🔐 Login no Sistema")
 
     try:
-        usuarios = supabase.table("usuarios").select("*").execute().data
-        df_users = pd.DataFrame(usuarios)
+        total_usuarios = repo.contar("usuarios")
     except Exception as e:
         st.error(f"❌ Erro ao conectar com o banco: {e}")
         return
 
-    if df_users.empty:
+    if not total_usuarios:
         st.warning("⚠️ Nenhum usuário cadastrado. Cadastre via Supabase.")
         return
 
@@ -110,17 +213,47 @@ def login_page():
     senha = st.text_input("Senha:", type="password")
 
     if st.button("Entrar"):
-        user = df_users[df_users["usuario"].str.lower() == usuario.strip().lower()]
-        if not user.empty and verificar_senha(senha, user.iloc[0]["senha"]):
+        try:
+            user = autenticar(repo, usuario, senha)
+        except TimeoutError:
+            st.error("⏳ A verificação da senha demorou demais. Tente novamente em instantes.")
+            return
+        except Exception as e:
+            st.error(f"❌ Erro ao conectar com o banco: {e}")
+            return
+        if user is not None:
             st.session_state["logado"] = True
-            st.session_state["usuario"] = user.iloc[0]["usuario"]
-            st.session_state["tipo"] = user.iloc[0].get("tipo", "usuario")
-            st.session_state["nome"] = user.iloc[0].get("nome", "Usuário")
+            st.session_state["usuario"] = user["usuario"]
+            st.session_state["tipo"] = user.get("tipo", "usuario")
+            st.session_state["nome"] = user.get("nome", "Usuário")
+            st.query_params["sessao"] = sessoes.criar(user["usuario"], conexao_atual())
             st.success(f"Bem-vindo(a), {st.session_state['nome']} 👋")
             st.rerun()
         else:
             st.error("❌ Usuário ou senha incorretos.")
 
+def restaurar_sessao():
+    """Reconexão com sessão válida na URL: entra sem verificar a senha de novo"""
+    id_sessao = st.query_params.get("sessao")
+    if not id_sessao:
+        return
+    # Cada id vale para uma única reconexão (um link antigo do histórico não entra mais)
+    # e só depois que a conexão que o recebeu fechou (link copiado de uma aba aberta não entra)
+    usuario = sessoes.consumir(id_sessao, conexao_atual())
+    try:
+        # Tipo e nome vêm do banco: usuário excluído ou rebaixado não herda o acesso anterior
+        registro = buscar_usuario(repo, usuario) if usuario else None
+    except Exception:
+        registro = None
+    if registro is None:
+        del st.query_params["sessao"]
+        return
+    st.session_state["logado"] = True
+    st.session_state["usuario"] = registro["usuario"]
+    st.session_state["tipo"] = registro.get("tipo", "usuario")
+    st.session_state["nome"] = registro.get("nome", "Usuário")
+    st.query_params["sessao"] = sessoes.criar(registro["usuario"], conexao_atual())
+
 # ====================================
 # APP PRINCIPAL
 # ====================================
@@ -129,7 +262,9 @@ def main_app():
     st.sidebar.markdown(f"🔐 Tipo: **{st.session_state['tipo']}**")
 
     if st.sidebar.button("🚪 Sair"):
+        sessoes.revogar(st.query_params.get("sessao"))
         st.session_state.clear()
+        st.query_params.clear()
         st.rerun()
 
     menu = st.sidebar.radio(
@@ -141,39 +276,69 @@ def main_app():
             "Registrar Desperdício ⚠️",
             "♻️ Remarcar Produtos",
             "📈 Relatórios",
+            "📉 Análises",
             "👥 Gerenciar Usuários",
-            "🧹 Zerar Sistema"
+            "🧹 Zerar Sistema",
+            "⏱️ Desempenho"
         ]
     )
+    rastro = rastro_atual()
+    if rastro is not None:
+        rastro.pagina = menu
+
+    # ---------- LEITURAS EM PARALELO ----------
+    # A página espera só pela leitura mais lenta; falhas parciais aparecem sem bloquear o resto
+    with etapa("leituras em paralelo"):
+        falhas = cache.aquecer(["producao", *TABELAS_POR_PAGINA.get(menu, [])], timeout=CONFIG_CACHE.get("timeout", 15))
+    for tabela, erro in falhas.items():
+        st.sidebar.warning(f"⚠️ Falha ao ler {tabela}: {erro}")
+
+    # ---------- FILA DE ESCRITA ----------
+    if fila is not None:
+        situacao = fila.situacao()
+        if situacao["pendentes"]:
+            st.sidebar.info(f"📤 {situacao['pendentes']} registro(s) aguardando envio ao banco.")
+            if situacao["ultimo_erro"]:
+                st.sidebar.caption(f"Última falha: {situacao['ultimo_erro']}")
+            if st.sidebar.button("🔁 Tentar enviar agora"):
+                fila.acordar()
 
     # ---------- ALERTAS ----------
-    try:
-        df_alertas = pd.DataFrame(supabase.table("producao").select("*").execute().data)
-        if not df_alertas.empty:
-            alertas = gerar_alertas(df_alertas)
+    # Sem a produção neste rerun os alertas ficam de fora (o aviso da falha já está acima)
+    if "producao" not in falhas:
+        try:
+            with etapa("alertas") as medida:
+                indice = cache.derivado("producao", IndiceValidade)
+                alertas, total_alertas = gerar_alertas(indice, limite=MAX_ALERTAS_SIDEBAR)
+                medida["linhas"] = total_alertas
             if alertas:
                 with st.sidebar.expander("🚨 Alertas de Validade", expanded=True):
                     for alerta in alertas:
-                        if "VENCIDO" in alerta:
-                            st.sidebar.error(alerta)
+                        if alerta.vencido:
+                            st.sidebar.error(alerta.texto())
                         else:
-                            st.sidebar.warning(alerta)
-    except Exception as e:
-        st.sidebar.error(f"Erro ao carregar alertas: {e}")
+                            st.sidebar.warning(alerta.texto())
+                    if total_alertas > len(alertas):
+                        st.sidebar.caption(f"… e mais {total_alertas - len(alertas)} alerta(s).")
+        except Exception as e:
+            st.sidebar.error(f"Erro ao carregar alertas: {e}")
 
     # ====================================
     # 📊 PAINEL DE STATUS
     # ====================================
     if menu == "📊 Painel de Status":
         st.header("📊 Painel de Produção e Desperdício")
-        producao = pd.DataFrame(supabase.table("producao").select("*").execute().data)
-        desperdicio = pd.DataFrame(supabase.table("desperdicio").select("*").execute().data)
-        if producao.empty:
+        if indisponivel(falhas, "estoque_produtos"):
+            return
+        with etapa("painel (estoque por produto)") as medida:
+            estoque_produtos = cache.obter("estoque_produtos")
+            medida["linhas"] = len(estoque_produtos)
+        if estoque_produtos.empty:
             st.info("Nenhum dado de produção registrado ainda.")
         else:
-            total_prod = producao["quantidade_produzida"].sum()
-            total_desp = desperdicio["quantidade_desperdicada"].sum() if not desperdicio.empty else 0
-            estoque = total_prod - total_desp
+            total_prod = estoque_produtos["quantidade_produzida"].sum()
+            total_desp = estoque_produtos["quantidade_desperdicada"].sum()
+            estoque = estoque_produtos["estoque_atual"].sum()
             col1, col2, col3 = st.columns(3)
             col1.metric("🧁 Produzido", int(total_prod))
             col2.metric("⚠️ Desperdiçado", int(total_desp))
@@ -184,140 +349,294 @@ def main_app():
     # ====================================
     elif menu == "📦 Estoque Atual":
         st.header("📦 Estoque Atual de Produtos")
-        producao = pd.DataFrame(supabase.table("producao").select("*").execute().data)
-        desperdicio = pd.DataFrame(supabase.table("desperdicio").select("*").execute().data)
-        if producao.empty:
-            st.info("Nenhum produto cadastrado.")
+        if indisponivel(falhas, "estoque_lotes"):
+            return
+        # Saldos por lote mantidos no banco (sql/supabase/001_estoque.sql)
+        with etapa("estoque (lotes)") as medida:
+            estoque_lotes = cache.obter("estoque_lotes")
+            medida["linhas"] = len(estoque_lotes)
+        if estoque_lotes.empty:
+            st.info("Nenhum lote com estoque.")
         else:
-            if not desperdicio.empty:
-                soma_desp = desperdicio.groupby("produto")["quantidade_desperdicada"].sum().reset_index()
-                producao = producao.merge(soma_desp, on="produto", how="left").fillna(0)
-            else:
-                producao["quantidade_desperdicada"] = 0
-            producao["estoque_atual"] = producao["quantidade_produzida"] - producao["quantidade_desperdicada"]
-            st.dataframe(producao[["produto", "cor", "quantidade_produzida", "quantidade_desperdicada", "estoque_atual", "data_validade"]])
+            with etapa("renderização"):
+                st.dataframe(estoque_lotes[["produto", "cor", "quantidade_produzida", "quantidade_desperdicada", "estoque_atual", "data_validade"]])
 
     # ====================================
     # 🧁 REGISTRAR PRODUÇÃO
     # ====================================
     elif menu == "Registrar Produção 🧁":
         st.header("🧁 Registrar Nova Produção")
-        produto = st.text_input("Produto:")
-        quantidade = st.number_input("Quantidade produzida:", min_value=1, step=1)
-        if st.button("💾 Salvar"):
-            data = datetime.now()
-            cor = cor_do_dia(data.weekday())
-            validade = (data + timedelta(days=2)).strftime("%Y-%m-%d")
-            supabase.table("producao").insert({
-                "data_producao": agora_fmt(),
-                "produto": produto,
-                "cor": cor,
-                "quantidade_produzida": json_safe(quantidade),
-                "data_validade": validade
-            }).execute()
-            st.success(f"✅ Produção registrada ({emoji_cor(cor)} {cor.upper()})")
+        modo = st.radio("Modo:", ["Individual", "Em lote (grade)", "Em lote (arquivo CSV/XLSX)"], horizontal=True)
+        if modo == "Individual":
+            produto = st.text_input("Produto:")
+            quantidade = st.number_input("Quantidade produzida:", min_value=1, step=1)
+            if st.button("💾 Salvar"):
+                linha = montar_producao(produto, quantidade)
+                if fila is not None:
+                    fila.enfileirar("producao", [linha])
+                else:
+                    repo.inserir("producao", [linha])
+                    invalidar("producao")
+                cor = linha["cor"]
+                st.success(f"✅ Produção registrada ({emoji_cor(cor)} {cor.upper()})")
+        else:
+            if modo == "Em lote (grade)":
+                grade = st.data_editor(
+                    pd.DataFrame({"produto": pd.Series(dtype="str"), "quantidade_produzida": pd.Series(dtype="Int64")}),
+                    num_rows="dynamic",
+                    use_container_width=True,
+                )
+            else:
+                st.caption("Mesmo formato de producao.csv: colunas **produto** e **quantidade_produzida** "
+                           "(data_producao opcional; cor e validade seguem a regra do dia).")
+                arquivo = st.file_uploader("Arquivo:", type=["csv", "xlsx"])
+                if arquivo is None:
+                    grade = pd.DataFrame()
+                elif arquivo.name.lower().endswith(".xlsx"):
+                    grade = pd.read_excel(arquivo)
+                else:
+                    grade = pd.read_csv(arquivo)
+            if not grade.empty:
+                linhas, erros = validar_producao_em_lote(grade)
+                if erros:
+                    st.error(f"❌ {len(erros)} problema(s) encontrado(s); essas linhas não serão salvas.")
+                    st.dataframe(pd.DataFrame(erros, columns=["linha", "erro"]), hide_index=True)
+                if linhas and st.button(f"💾 Salvar {len(linhas)} produção(ões)"):
+                    if fila is not None:
+                        fila.enfileirar("producao", linhas)
+                    else:
+                        try:
+                            inserir_em_lotes(repo, "producao", linhas)
+                        finally:
+                            invalidar("producao")
+                    st.success(f"✅ {len(linhas)} produção(ões) registrada(s)!")
+        mostrar_envios("producao")
 
     # ====================================
     # ⚠️ REGISTRAR DESPERDÍCIO
     # ====================================
     elif menu == "Registrar Desperdício ⚠️":
         st.header("⚠️ Registrar Desperdício")
-        producao = pd.DataFrame(supabase.table("producao").select("*").execute().data)
-        if producao.empty:
+        if indisponivel(falhas, "estoque_lotes"):
+            return
+        # Com a fila, o desperdício ainda não enviado já saiu do saldo: ao refazer o alocador a partir
+        # do banco, ele é descontado de novo para o mesmo estoque não ser alocado duas vezes.
+        # Os pendentes são lidos antes de sincronizar estoque_lotes: uma linha enviada no meio
+        # é descontada duas vezes (mais estreito), nunca nenhuma
+        pendente = fila.desperdicio_pendente() if fila is not None else None
+        alocador = cache.derivado(
+            "estoque_lotes", lambda estoque_lotes: AlocadorFIFO(estoque_lotes, pendente), chave=AlocadorFIFO
+        )
+        produtos = alocador.produtos()
+        if not produtos:
             st.info("Nenhum produto disponível.")
         else:
-            produto = st.selectbox("Produto:", producao["produto"].unique())
+            produto = st.selectbox("Produto:", produtos)
             quantidade = st.number_input("Quantidade desperdiçada:", min_value=1, step=1)
             motivo = st.text_area("Motivo:")
             if st.button("💾 Registrar"):
-                sel = producao[producao["produto"] == produto].iloc[0]
-                supabase.table("desperdicio").insert({
-                    "data_desperdicio": agora_fmt(),
-                    "produto": produto,
-                    "cor": sel["cor"],
-                    "quantidade_desperdicada": json_safe(quantidade),
-                    "motivo": motivo,
-                    "id_producao": json_safe(sel["id"])
-                }).execute()
-                st.success("✅ Desperdício registrado!")
+                try:
+                    alocacao = alocador.alocar(produto, int(quantidade))
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    # Um registro por lote consumido (o que vence primeiro sai primeiro), num único insert
+                    agora = agora_fmt()
+                    linhas = [{
+                        "data_desperdicio": agora,
+                        "produto": produto,
+                        "cor": cor,
+                        "quantidade_desperdicada": json_safe(qtd),
+                        "motivo": motivo,
+                        "id_producao": json_safe(id_producao)
+                    } for id_producao, cor, qtd in alocacao]
+                    if fila is not None:
+                        # O alocador já descontou o saldo; os snapshots vencem quando a fila enviar
+                        # (e, se vencerem antes, o alocador novo desconta o que segue pendente)
+                        fila.enfileirar("desperdicio", linhas)
+                    else:
+                        try:
+                            repo.inserir("desperdicio", linhas)
+                        finally:
+                            invalidar("desperdicio")
+                    st.success(f"✅ Desperdício registrado em {len(alocacao)} lote(s)!")
+            mostrar_envios("desperdicio")
 
     # ====================================
     # ♻️ REMARCAR PRODUTOS
     # ====================================
     elif menu == "♻️ Remarcar Produtos":
         st.header("♻️ Remarcação de Produtos")
-        producao = pd.DataFrame(supabase.table("producao").select("*").execute().data)
-        if producao.empty:
+        if indisponivel(falhas, "producao", "estoque_lotes"):
+            return
+        with etapa("remarcar (vencimentos)") as medida:
+            indice = cache.derivado("producao", IndiceValidade)
+            # Só lotes com saldo: a remarcação valida contra estoque_lotes.estoque_atual (o que sobrou do desperdício),
+            # menos o desperdício ainda na fila (lido antes de sincronizar, como no alocador)
+            pendente = fila.desperdicio_pendente() if fila is not None else {}
+            saldos = cache.obter("estoque_lotes").reindex(columns=["id_producao", "estoque_atual"])
+            saldos = saldos.assign(
+                estoque_atual=(saldos["estoque_atual"] - saldos["id_producao"].map(pendente).fillna(0)).astype("int64")
+            )
+            saldos = saldos[saldos["estoque_atual"] > 0]
+            exp = indice.entre(None, 2).rename(columns={"dias": "dias_restantes"})
+            if not exp.empty:
+                exp = exp.merge(saldos.rename(columns={"id_producao": "id"}), on="id")
+            medida["linhas"] = len(exp)
+        if indice.df.empty:
             st.info("Nenhum produto para remarcar.")
         else:
-            producao["data_validade"] = pd.to_datetime(producao["data_validade"], errors="coerce")
-            hoje = datetime.now().date()
-            producao["dias_restantes"] = producao["data_validade"].apply(lambda x: (x.date() - hoje).days if pd.notnull(x) else None)
-            exp = producao[producao["dias_restantes"] <= 2]
             if exp.empty:
                 st.success("✅ Nenhum produto próximo do vencimento.")
             else:
-                st.dataframe(exp[["id", "produto", "quantidade_produzida", "data_validade"]])
-                id_sel = st.number_input("ID do produto:", min_value=1, step=1)
-                dias_extra = st.number_input("Dias adicionais:", min_value=1, value=2)
-                quantidade_remarcar = st.number_input("Quantidade a remarcar:", min_value=1, step=1)
-                if st.button("♻️ Aplicar Remarcação"):
-                    if id_sel not in exp["id"].values:
-                        st.error("❌ ID inválido.")
+                # Marque os lotes e ajuste quantidade/dias; tudo é aplicado numa única transação
+                grade = exp[["id", "produto", "estoque_atual", "data_validade", "dias_restantes"]].assign(
+                    remarcar=False, quantidade=exp["estoque_atual"], dias_extra=2
+                )
+                grade = st.data_editor(
+                    grade,
+                    hide_index=True,
+                    disabled=["id", "produto", "estoque_atual", "data_validade", "dias_restantes"],
+                    column_config={
+                        "remarcar": st.column_config.CheckboxColumn("Remarcar?"),
+                        "quantidade": st.column_config.NumberColumn("Quantidade a remarcar", min_value=1, step=1),
+                        "dias_extra": st.column_config.NumberColumn("Dias adicionais", min_value=1, step=1),
+                    },
+                )
+                selecionados = grade[grade["remarcar"]]
+                if st.button(f"♻️ Aplicar Remarcação ({len(selecionados)} lote(s))", disabled=selecionados.empty):
+                    excedidos = selecionados[selecionados["quantidade"] > selecionados["estoque_atual"]]
+                    if not excedidos.empty:
+                        for _, lote in excedidos.iterrows():
+                            st.error(f"❌ Lote {lote['id']}: quantidade excede o estoque ({int(lote['estoque_atual'])}).")
                     else:
-                        prod_sel = exp[exp["id"] == id_sel].iloc[0]
-                        qtd_existente = int(prod_sel["quantidade_produzida"])
-                        if quantidade_remarcar > qtd_existente:
-                            st.error(f"❌ Quantidade excede ({qtd_existente}).")
+                        try:
+                            itens = json_safe(selecionados[["id", "quantidade", "dias_extra"]])
+                            novos = repo.remarcar_lotes(
+                                [(i["id"], i["quantidade"], i["dias_extra"]) for i in itens], agora_fmt()
+                            )
+                        except Exception as e:
+                            st.error(f"❌ Nenhum lote foi remarcado: {e}")
                         else:
-                            nova_validade = (datetime.now() + timedelta(days=dias_extra)).strftime("%Y-%m-%d")
-                            supabase.table("producao").update({
-                                "quantidade_produzida": json_safe(qtd_existente - quantidade_remarcar),
-                                "data_remarcacao": agora_fmt()
-                            }).eq("id", int(id_sel)).execute()
-                            supabase.table("producao").insert({
-                                "data_producao": agora_fmt(),
-                                "produto": prod_sel["produto"],
-                                "quantidade_produzida": json_safe(quantidade_remarcar),
-                                "cor": prod_sel["cor"],
-                                "data_validade": nova_validade
-                            }).execute()
-                            st.success(f"✅ {quantidade_remarcar} unidades remarcadas até {nova_validade}.")
+                            st.success(f"✅ {len(novos)} lote(s) remarcado(s), {int(selecionados['quantidade'].sum())} unidades.")
+                        finally:
+                            invalidar("producao")
 
     # ====================================
     # 📈 RELATÓRIOS (com exportar)
     # ====================================
     elif menu == "📈 Relatórios":
         st.header("📈 Relatórios de Produção e Desperdício")
+        # Relatórios padrão já prontos (precalculo.py): só servem o arquivo, sem consultar o banco
+        manifesto = ler_manifesto(PASTA_ARTEFATOS)
+        if manifesto:
+            mimes = {ext: mime for ext, mime in FORMATOS.values()}
+            with st.expander(f"📦 Relatórios prontos (gerados em {manifesto['gerado_em']})"):
+                for item in manifesto["artefatos"]:
+                    caminho = PASTA_ARTEFATOS / item["nome"]
+                    st.download_button(
+                        f"📥 {item['descricao']} — {item['linhas']} linha(s)", caminho.read_bytes,
+                        file_name=item["nome"], mime=mimes.get(item["nome"].split(".", 1)[1]), key=f"pronto_{item['nome']}",
+                    )
         tipo = st.radio("Tipo de relatório:", ["Produção", "Desperdício"])
         tabela = "producao" if tipo == "Produção" else "desperdicio"
         campo_data = "data_producao" if tipo == "Produção" else "data_desperdicio"
         ini = st.date_input("Data inicial:", datetime.now().date() - timedelta(days=7))
         fim = st.date_input("Data final:", datetime.now().date())
-        df = pd.DataFrame(supabase.table(tabela).select("*").execute().data)
+        # Sem o snapshot de produção, a lista fica vazia (o relatório em si consulta o banco direto)
+        produtos_disp = [] if "producao" in falhas else cache.derivado("producao", nomes_produtos)
+        produtos = st.multiselect("Produtos (vazio = todos):", produtos_disp)
+        with etapa("relatório (consulta)") as medida:
+            df = carregar_relatorio(tabela, campo_data, ini, fim, tuple(produtos))
+            medida["linhas"] = len(df)
         if df.empty:
-            st.info(f"Nenhum registro encontrado em **{tabela}**.")
+            st.warning("Nenhum dado encontrado nesse período.")
         else:
-            if campo_data in df.columns:
-                df[campo_data] = pd.to_datetime(df[campo_data], errors="coerce")
-                df = df[(df[campo_data].dt.date >= ini) & (df[campo_data].dt.date <= fim)]
-            if df.empty:
-                st.warning("Nenhum dado encontrado nesse período.")
-            else:
-                col_quant = "quantidade_produzida" if tipo == "Produção" else "quantidade_desperdicada"
-                total = int(df[col_quant].sum())
-                st.dataframe(df)
-                st.success(f"**Total {tipo.lower()} no período:** {total}")
-                formato = st.radio("Exportar como:", ["Excel (.xlsx)", "CSV (.csv)"])
-                nome = f"{tabela}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                if formato == "Excel (.xlsx)":
-                    buffer = BytesIO()
-                    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-                        df.to_excel(writer, index=False)
-                    st.download_button("📥 Baixar Excel", buffer.getvalue(), file_name=f"{nome}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-                else:
-                    csv = df.to_csv(index=False).encode("utf-8")
-                    st.download_button("📥 Baixar CSV", csv, file_name=f"{nome}.csv", mime="text/csv")
+            col_quant = "quantidade_produzida" if tipo == "Produção" else "quantidade_desperdicada"
+            total = int(df[col_quant].sum())
+            linhas_pagina = 100
+            paginas = (len(df) - 1) // linhas_pagina + 1
+            pagina = st.number_input(f"Página (de {paginas}):", min_value=1, max_value=paginas, step=1) if paginas > 1 else 1
+            inicio = (pagina - 1) * linhas_pagina
+            with etapa("renderização"):
+                st.dataframe(df.iloc[inicio:inicio + linhas_pagina])
+            st.caption(f"{len(df)} registro(s) no período")
+            st.success(f"**Total {tipo.lower()} no período:** {total}")
+            formato = st.radio("Exportar como:", list(FORMATOS))
+            extensao, mime = FORMATOS[formato]
+            nome = f"{tabela}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+            usuario = st.session_state["usuario"]
+
+            def gerar_exportacao():
+                # Só roda quando o botão é clicado (fora do rerun): tem rastro próprio
+                with historico.rastrear("📥 Exportação", usuario), etapa(f"exportação ({extensao})") as medida, \
+                        tempfile.TemporaryFile() as arquivo:
+                    colunas = COLUNAS_RELATORIO[tabela]
+                    paginas = chain(
+                        arquivo_historico.iterar_periodo(tabela, campo_data, ini, fim, colunas, produtos),
+                        iterar_paginas(repo, tabela, colunas, filtros_periodo(campo_data, ini, fim, produtos)),
+                    )
+                    medida["linhas"] = exportar(paginas, extensao, arquivo, colunas)
+                    # A montagem do arquivo vai página a página para o disco; o download_button
+                    # só aceita bytes/BytesIO/BufferedReader e carrega o arquivo pronto inteiro na memória
+                    arquivo.seek(0)
+                    return arquivo.read()
+
+            st.download_button("📥 Baixar arquivo", gerar_exportacao, file_name=f"{nome}.{extensao}", mime=mime)
+
+    # ====================================
+    # 📉 ANÁLISES DE DESPERDÍCIO
+    # ====================================
+    elif menu == "📉 Análises":
+        st.header("📉 Análises de Desperdício")
+        col1, col2 = st.columns(2)
+        ini = col1.date_input("Data inicial:", datetime.now().date() - timedelta(days=90))
+        fim = col2.date_input("Data final:", datetime.now().date())
+        col1, col2, col3 = st.columns(3)
+        frequencia = FREQUENCIAS[col1.radio("Agrupar por:", list(FREQUENCIAS), horizontal=True)]
+        janela = col2.number_input("Média móvel (períodos):", min_value=1, max_value=60, value=7, step=1)
+        top_n = col3.number_input("Piores produtos (top N):", min_value=1, max_value=50, value=10, step=1)
+        with etapa("análises (resumos)") as medida:
+            resumo, motivos = carregar_resumos(ini, fim)
+            medida["linhas"] = len(resumo) + len(motivos)
+        if resumo.empty:
+            st.info("Nenhum dado no período.")
+        else:
+            produzido = int(resumo["quantidade_produzida"].sum())
+            desperdicado = int(resumo["quantidade_desperdicada"].sum())
+            col1, col2, col3 = st.columns(3)
+            col1.metric("🧁 Produzido", produzido)
+            col2.metric("⚠️ Desperdiçado", desperdicado)
+            col3.metric("📉 Taxa de desperdício", f"{desperdicado / produzido * 100:.1f}%" if produzido else "—")
+
+            st.subheader("Taxa de desperdício no tempo")
+            serie = serie_periodo(resumo, frequencia, janela)
+            st.line_chart(serie[["taxa_%", "taxa_móvel_%"]])
+            st.bar_chart(serie[["quantidade_produzida", "quantidade_desperdicada"]])
+
+            st.subheader(f"🏆 Top {top_n} produtos com maior taxa de desperdício")
+            piores = piores_produtos(resumo, top_n)
+            st.bar_chart(piores.set_index("produto")["taxa_%"].astype(float), horizontal=True)
+            st.dataframe(piores, hide_index=True)
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.subheader("Por motivo")
+                st.bar_chart(por_motivo(motivos).set_index("motivo"))
+            with col2:
+                st.subheader("Por cor do dia")
+                cores = por_cor(resumo)
+                st.dataframe(
+                    cores.assign(cor=cores["cor"].astype(object).map(lambda c: f"{emoji_cor(c)} {c}")),
+                    hide_index=True,
+                )
+
+            st.subheader("Tendência por produto")
+            escolhidos = st.multiselect("Produtos:", list(piores["produto"].astype(object)),
+                                        default=list(piores["produto"].astype(object).head(3)))
+            if escolhidos:
+                st.line_chart(taxa_por_produto(resumo, escolhidos, frequencia))
 
     # ====================================
     # 👥 GERENCIAR USUÁRIOS
@@ -336,24 +655,31 @@ def main_app():
             if st.button("💾 Cadastrar"):
                 if not usuario or not senha:
                     st.error("Preencha todos os campos obrigatórios.")
+                elif buscar_usuario(repo, usuario) is not None:
+                    st.error(f"❌ O usuário '{usuario.strip().lower()}' já existe.")
                 else:
                     senha_hash = hash_senha(senha)
-                    supabase.table("usuarios").insert({
-                        "nome": nome,
-                        "usuario": usuario.lower(),
-                        "senha": senha_hash,
-                        "tipo": tipo
-                    }).execute()
-                    st.success("✅ Usuário cadastrado com sucesso!")
+                    try:
+                        repo.inserir("usuarios", [{
+                            "nome": nome,
+                            "usuario": usuario.strip().lower(),
+                            "senha": senha_hash,
+                            "tipo": tipo
+                        }])
+                    except Exception as e:
+                        # Índice único em usuarios.usuario (cadastro simultâneo com o mesmo nome)
+                        st.error(f"❌ Não foi possível cadastrar o usuário: {e}")
+                    else:
+                        st.success("✅ Usuário cadastrado com sucesso!")
         else:
-            usuarios = pd.DataFrame(supabase.table("usuarios").select("*").execute().data)
+            usuarios = pd.DataFrame(repo.selecionar("usuarios", ["id", "nome", "usuario", "tipo"]))
             if usuarios.empty:
                 st.info("Nenhum usuário cadastrado.")
             else:
                 st.dataframe(usuarios)
                 id_sel = st.number_input("ID do usuário para excluir:", min_value=1, step=1)
                 if st.button("🗑️ Excluir"):
-                    supabase.table("usuarios").delete().eq("id", int(id_sel)).execute()
+                    repo.excluir("usuarios", [("id", "eq", int(id_sel))])
                     st.success("✅ Usuário excluído com sucesso!")
 
     # ====================================
@@ -364,16 +690,68 @@ def main_app():
         if st.session_state["tipo"] != "admin":
             st.warning("⚠️ Apenas administradores podem zerar o sistema.")
         else:
-            st.error("🚨 Esta ação apagará todos os dados do sistema!")
+            st.subheader("🗄️ Arquivar lotes antigos")
+            st.caption(
+                f"Lotes produzidos e vencidos antes do corte (e o desperdício deles) vão para "
+                f"arquivos Parquet em `{arquivo_historico.pasta}`. Relatórios e análises continuam incluindo esses dados."
+            )
+            dias = st.number_input("Arquivar lotes fechados há mais de (dias):", min_value=1, step=1,
+                                   value=int(CONFIG_RETENCAO.get("dias", RETENCAO_DIAS)))
+            if st.button("🗄️ Arquivar agora"):
+                try:
+                    with st.spinner("Arquivando em lotes..."):
+                        total = arquivar_antigos(repo, arquivo_historico, dias)
+                finally:
+                    invalidar()
+                st.success(f"✅ {total['producao']} lote(s) e {total['desperdicio']} desperdício(s) arquivados.")
+
+            st.subheader("🧨 Zerar")
+            st.error("🚨 Esta ação retira todos os dados das tabelas do sistema (eles são arquivados antes de apagar)!")
             if st.button("🧨 Confirmar e Apagar Tudo"):
-                supabase.table("producao").delete().neq("id", 0).execute()
-                supabase.table("desperdicio").delete().neq("id", 0).execute()
-                st.success("✅ Sistema zerado com sucesso!")
+                try:
+                    with st.spinner("Arquivando e apagando em lotes..."):
+                        total = arquivar_tudo(repo, arquivo_historico)
+                finally:
+                    invalidar()
+                st.success(f"✅ Sistema zerado com sucesso! {sum(total.values())} linha(s) arquivadas.")
+
+    # ====================================
+    # ⏱️ DESEMPENHO
+    # ====================================
+    elif menu == "⏱️ Desempenho":
+        st.header("⏱️ Desempenho (somente para administradores)")
+        if st.session_state["tipo"] != "admin":
+            st.warning("⚠️ Apenas administradores podem ver o desempenho.")
+        else:
+            rastros = historico.rastros()
+            if not rastros:
+                st.info("Nenhum rerun registrado ainda.")
+            else:
+                st.caption(f"{len(rastros)} rerun(s) registrados desde que o servidor iniciou.")
+                st.subheader("Percentis por etapa e chamada ao banco")
+                st.dataframe(historico.percentis(), hide_index=True)
+
+                st.subheader("Histórico")
+                eventos = historico.eventos()
+                nomes = sorted(eventos["nome"].unique())
+                nome = st.selectbox("Etapa:", nomes, index=nomes.index("rerun"))
+                serie = eventos[eventos["nome"] == nome].set_index("inicio")["duracao_ms"]
+                janela = serie.rolling(20, min_periods=1)
+                st.line_chart(pd.DataFrame({"ms": serie, "p50 (20)": janela.quantile(0.5), "p95 (20)": janela.quantile(0.95)}))
+
+                st.subheader("Último rerun concluído")
+                st.dataframe(pd.DataFrame(rastros[-1]["eventos"]), hide_index=True)
+
+                nome_arquivo = f"desempenho_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+                st.download_button("📥 Exportar rastros (JSON lines)", historico.jsonl(), file_name=nome_arquivo, mime="application/jsonl")
 
 # ====================================
 # EXECUÇÃO
 # ====================================
+if "logado" not in st.session_state or not st.session_state["logado"]:
+    restaurar_sessao()
 if "logado" not in st.session_state or not st.session_state["logado"]:
     login_page()
 else:
-    main_app()
+    with historico.rastrear(usuario=st.session_state["usuario"]):
+        main_app()
@@ -2,8 +2,7 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import plotly.express as px
-import gspread
-from google.oauth2.service_account import Credentials
+from repositorio import RepositorioSheets, conectar_planilha
 
 # ==============================
 # CONFIGURAÇÃO
@@ -19,29 +18,20 @@ def conectar_sheets():
     st.info("🔄 Tentando conectar ao Google Sheets...")
 
     try:
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
         creds_dict = st.secrets["connections"]["gsheets"]
-        creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
-        client = gspread.authorize(creds)
+        planilha = conectar_planilha(creds_dict, "1U3XbcY2uGBNrcsQZDAEuo4O-9yH2-FuMUctsb11a69E")
         st.success("✅ Conexão com Google Sheets estabelecida.")
-        planilha = client.open_by_key("1U3XbcY2uGBNrcsQZDAEuo4O-9yH2-FuMUctsb11a69E")
         st.success("✅ Planilha aberta com sucesso!")
-        return planilha
+        return RepositorioSheets(planilha)
     except Exception as e:
         st.error(f"❌ Falha ao conectar ao Google Sheets: {e}")
         return None
 
-def carregar_planilhas(planilha):
+def carregar_planilhas(repo):
     st.info("📂 Carregando abas de produção e desperdício...")
     try:
-        producao_ws = planilha.worksheet("producao")
-        desperdicio_ws = planilha.worksheet("desperdicio")
-
-        producao = pd.DataFrame(producao_ws.get_all_records())
-        desperdicio = pd.DataFrame(desperdicio_ws.get_all_records())
+        # As duas abas numa única chamada (batch_get); o snapshot lido é a base das escritas por diferença
+        producao, desperdicio = repo.ler_abas("producao", "desperdicio")
 
         st.success(f"📊 Produção: {len(producao)} linhas | Desperdício: {len(desperdicio)} linhas")
 
@@ -60,26 +50,24 @@ def carregar_planilhas(planilha):
         st.error(f"❌ Erro ao carregar abas: {e}")
         return pd.DataFrame(), pd.DataFrame()
 
-def salvar_planilha(planilha, aba, df):
+def salvar_planilha(repo, aba, df):
     try:
-        ws = planilha.worksheet(aba)
-        ws.clear()
-        if not df.empty:
-            ws.update([df.columns.values.tolist()] + df.values.tolist())
-            st.success(f"✅ Dados salvos na aba '{aba}' ({len(df)} registros).")
-        else:
-            ws.update([[""]])
-            st.warning(f"⚠️ Aba '{aba}' foi limpa (sem dados).")
+        # Envia só as linhas novas, alteradas e removidas em relação ao que foi carregado
+        resumo = repo.salvar(aba, df)
+        st.success(
+            f"✅ Aba '{aba}' salva: {resumo['novas']} nova(s), {resumo['alteradas']} alterada(s), "
+            f"{resumo['removidas']} removida(s)."
+        )
     except Exception as e:
         st.error(f"❌ Erro ao salvar na aba {aba}: {e}")
 
 # ==============================
 # TESTE INICIAL DE CONEXÃO
 # ==============================
-planilha = conectar_sheets()
+repo = conectar_sheets()
 
-if planilha:
-    producao, desperdicio = carregar_planilhas(planilha)
+if repo:
+    producao, desperdicio = carregar_planilhas(repo)
 else:
     st.stop()
 
@@ -0,0 +1,154 @@
+# ====================================
+# 🗄️ ARQUIVAMENTO (RETENÇÃO QUENTE/FRIA)
+# ====================================
+# Lotes fechados e antigos saem de producao/desperdicio para arquivos
+# Parquet (zstd) particionados por mês:
+#   <pasta>/<tabela>/mes=AAAA-MM/ids-<primeiro>-<último>.parquet
+# Os totais continuam nos resumos diários (sql/*/004_resumos.sql não
+# desconta exclusões) e os relatórios leem o arquivo quando o período
+# chega nele. Tudo em lotes limitados: nada de um delete sem fim.
+# ====================================
+
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from dados import TAMANHO_PAGINA, buscar_paginado, filtros_periodo, tipar
+from repositorio import filtrar_df
+
+TAMANHO_LOTE_ARQUIVO = 500  # linhas por rodada (e ids por filtro "in" no delete)
+RETENCAO_DIAS = 180
+
+# tabela -> coluna de data que define o mês da partição
+CAMPOS_DATA = {"producao": "data_producao", "desperdicio": "data_desperdicio"}
+SEM_DATA = "sem-data"
+
+
+class ArquivoHistorico:
+    """Partições mensais em Parquet de linhas retiradas das tabelas vivas"""
+
+    def __init__(self, pasta="arquivo"):
+        self.pasta = Path(pasta)
+
+    def meses(self, tabela):
+        """Meses (AAAA-MM) com alguma partição gravada"""
+        base = self.pasta / tabela
+        if not base.is_dir():
+            return []
+        return sorted(p.name.split("=", 1)[1] for p in base.glob("mes=*") if p.is_dir())
+
+    def gravar(self, tabela, linhas):
+        """Grava as linhas (dicts) nas partições do mês de cada uma; retorna o nº de linhas"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not linhas:
+            return 0
+        campo = CAMPOS_DATA[tabela]
+        por_mes = {}
+        for linha in linhas:
+            data = linha.get(campo)
+            por_mes.setdefault(str(data)[:7] if data else SEM_DATA, []).append(linha)
+        for mes, grupo in por_mes.items():
+            tabela_pa = pa.Table.from_pylist(grupo)
+            # Colunas só com nulos viram texto (mesma regra da exportação Parquet)
+            tabela_pa = tabela_pa.cast(pa.schema([
+                pa.field(c.name, pa.string()) if pa.types.is_null(c.type) else c for c in tabela_pa.schema
+            ]))
+            pasta = self.pasta / tabela / f"mes={mes}"
+            pasta.mkdir(parents=True, exist_ok=True)
+            # Nome pelos ids: repetir uma rodada interrompida sobrescreve o mesmo arquivo
+            destino = pasta / f"ids-{grupo[0]['id']}-{grupo[-1]['id']}.parquet"
+            temporario = destino.with_suffix(".tmp")
+            pq.write_table(tabela_pa, temporario, compression="zstd")
+            os.replace(temporario, destino)
+        return len(linhas)
+
+    def _arquivos(self, tabela, ini, fim):
+        # Mês a mês e, dentro do mês, na ordem dos ids (nome "ids-<primeiro>-<último>.parquet")
+        for mes in self.meses(tabela):
+            if ini.isoformat()[:7] <= mes <= fim.isoformat()[:7]:
+                arquivos = (self.pasta / tabela / f"mes={mes}").glob("*.parquet")
+                yield sorted(arquivos, key=lambda a: int(a.stem.split("-")[1]))
+
+    def _iterar_lotes(self, tabela, campo_data, ini, fim, colunas=None, produtos=None, tamanho_lote=TAMANHO_PAGINA):
+        """DataFrames já filtrados, um por lote de cada arquivo: nunca o período inteiro na memória"""
+        import pyarrow.parquet as pq
+
+        # Mesmos filtros (e mesma comparação de texto) das consultas ao banco
+        filtros = filtros_periodo(campo_data, ini, fim, produtos)
+        leitura = None if colunas is None else list(dict.fromkeys(["id", *colunas, *(f[0] for f in filtros)]))
+        for arquivos in self._arquivos(tabela, ini, fim):
+            # Uma rodada repetida com outro tamanho de lote pode ter gravado o mesmo id em dois arquivos do mês
+            vistos = set()
+            for arquivo in arquivos:
+                for lote in pq.ParquetFile(arquivo).iter_batches(batch_size=tamanho_lote, columns=leitura):
+                    df = filtrar_df(lote.to_pandas(), filtros)
+                    df = df[~df["id"].isin(vistos)].drop_duplicates(subset="id")
+                    if df.empty:
+                        continue
+                    vistos.update(df["id"].tolist())
+                    yield df if colunas is None else df[colunas]
+
+    def ler_periodo(self, tabela, campo_data, ini, fim, colunas=None, produtos=None):
+        """Linhas arquivadas do período, no mesmo layout tipado dos relatórios"""
+        lotes = list(self._iterar_lotes(tabela, campo_data, ini, fim, colunas, produtos))
+        if not lotes:
+            return tipar(pd.DataFrame(columns=colunas))
+        return tipar(pd.concat(lotes, ignore_index=True).sort_values("id", ignore_index=True))
+
+    def iterar_periodo(self, tabela, campo_data, ini, fim, colunas=None, produtos=None, tamanho_pagina=TAMANHO_PAGINA):
+        """Linhas arquivadas do período em páginas de dicts (mesmo formato de iterar_paginas)"""
+        for df in self._iterar_lotes(tabela, campo_data, ini, fim, colunas, produtos, tamanho_pagina):
+            yield df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _arquivar_e_excluir(repo, arquivo, tabela, linhas, tamanho_lote):
+    # Primeiro grava o arquivo, depois apaga: uma falha no meio não perde linhas
+    for inicio in range(0, len(linhas), tamanho_lote):
+        lote = linhas[inicio:inicio + tamanho_lote]
+        arquivo.gravar(tabela, lote)
+        repo.excluir(tabela, [("id", "in", [linha["id"] for linha in lote])])
+    return len(linhas)
+
+
+def arquivar_antigos(repo, arquivo, dias=RETENCAO_DIAS, tamanho_lote=TAMANHO_LOTE_ARQUIVO, agora=None):
+    """Arquiva os lotes fechados há mais de `dias` dias, com o desperdício lançado neles
+
+    Lote fechado = produzido e vencido antes do corte (o saldo que sobrou já
+    não pode ser vendido). Retorna {"producao": n, "desperdicio": n}.
+    """
+    corte = ((agora or datetime.now()) - timedelta(days=dias)).date().isoformat()
+    total = {"producao": 0, "desperdicio": 0}
+    # Avança pelo id: se o banco não apagar (ex.: política que permite ler mas não excluir),
+    # a próxima rodada não relê as mesmas linhas e o laço termina
+    ultimo = 0
+    while True:
+        lotes = repo.selecionar(
+            "producao", filtros=[("data_producao", "lt", corte), ("data_validade", "lt", corte), ("id", "gt", ultimo)],
+            ordem="id", limite=tamanho_lote,
+        )
+        if not lotes:
+            return total
+        ids = [lote["id"] for lote in lotes]
+        ultimo = ids[-1]
+        desperdicio = buscar_paginado(repo, "desperdicio", filtros=[("id_producao", "in", ids)])
+        total["desperdicio"] += _arquivar_e_excluir(repo, arquivo, "desperdicio", desperdicio, tamanho_lote)
+        total["producao"] += _arquivar_e_excluir(repo, arquivo, "producao", lotes, tamanho_lote)
+
+
+def arquivar_tudo(repo, arquivo, tabelas=("desperdicio", "producao"), tamanho_lote=TAMANHO_LOTE_ARQUIVO):
+    """Arquiva e esvazia as tabelas, `tamanho_lote` linhas por vez; retorna {tabela: n}"""
+    total = {}
+    for tabela in tabelas:
+        total[tabela] = 0
+        ultimo = 0  # avança pelo id, como em arquivar_antigos
+        while True:
+            linhas = repo.selecionar(tabela, filtros=[("id", "gt", ultimo)], ordem="id", limite=tamanho_lote)
+            if not linhas:
+                break
+            ultimo = linhas[-1]["id"]
+            total[tabela] += _arquivar_e_excluir(repo, arquivo, tabela, linhas, tamanho_lote)
+    return total
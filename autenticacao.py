@@ -0,0 +1,104 @@
+# ====================================
+# 🔐 AUTENTICAÇÃO
+# ====================================
+# Login consulta só o usuário digitado (índice em usuarios.usuario),
+# roda o bcrypt num pool de threads limitado e abre uma sessão no
+# servidor para que reconexões não precisem verificar a senha de novo.
+# O navegador leva só um id aleatório da sessão: "Sair" o revoga,
+# cada reconexão troca o id por um novo e, enquanto a sessão que o
+# recebeu continua conectada, o id não abre outra.
+# ====================================
+
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+MAX_VERIFICACOES_SIMULTANEAS = 4
+TIMEOUT_VERIFICACAO = 10  # segundos
+VALIDADE_SESSAO = 12 * 3600  # segundos (um turno)
+COLUNAS_LOGIN = ["id", "nome", "usuario", "senha", "tipo"]
+
+# O bcrypt libera o GIL: vários logins na troca de turno rodam em paralelo,
+# mas no máximo MAX_VERIFICACOES_SIMULTANEAS por vez
+_pool_bcrypt = ThreadPoolExecutor(max_workers=MAX_VERIFICACOES_SIMULTANEAS, thread_name_prefix="bcrypt")
+
+
+def hash_senha(senha):
+    return bcrypt.hashpw(senha.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+
+def verificar_senha(senha_digitada, senha_hash):
+    try:
+        return bcrypt.checkpw(senha_digitada.encode("utf-8"), senha_hash.encode("utf-8"))
+    except Exception:
+        return False
+
+
+def buscar_usuario(repo, usuario):
+    """Registro de um único usuário (usuários são gravados em minúsculas), ou None"""
+    linhas = repo.selecionar("usuarios", COLUNAS_LOGIN, [("usuario", "eq", usuario.strip().lower())], limite=1)
+    return linhas[0] if linhas else None
+
+
+def autenticar(repo, usuario, senha):
+    """Retorna o registro do usuário (sem o hash) se a senha confere, senão None"""
+    registro = buscar_usuario(repo, usuario)
+    if registro is None:
+        return None
+    futuro = _pool_bcrypt.submit(verificar_senha, senha, registro["senha"])
+    if not futuro.result(timeout=TIMEOUT_VERIFICACAO):
+        return None
+    return {c: v for c, v in registro.items() if c != "senha"}
+
+
+# ====================================
+# SESSÕES DE RECONEXÃO
+# ====================================
+class SessoesServidor:
+    """Sessões guardadas no servidor: id aleatório -> (usuário, expiração, dono)
+
+    Não levam o tipo do usuário: quem restaura a sessão relê o registro no banco.
+    `dono` é a conexão que recebeu o id; sessao_ativa(dono) diz se ela ainda
+    está aberta (sem a função, o id vale para qualquer conexão).
+    """
+
+    def __init__(self, validade=VALIDADE_SESSAO, sessao_ativa=None):
+        self.validade = validade
+        self.sessao_ativa = sessao_ativa
+        self._sessoes = {}
+        self._lock = threading.Lock()
+
+    def criar(self, usuario, dono=None):
+        """Abre uma sessão para o usuário, presa à conexão `dono`, e retorna o id"""
+        id_sessao = secrets.token_urlsafe(32)
+        agora = time.time()
+        with self._lock:
+            # Aproveita para descartar as expiradas
+            self._sessoes = {i: s for i, s in self._sessoes.items() if s[1] > agora}
+            self._sessoes[id_sessao] = (usuario, agora + self.validade, dono)
+        return id_sessao
+
+    def consumir(self, id_sessao, dono=None):
+        """Usuário da sessão (que deixa de valer), ou None se não existe, expirou
+        ou a conexão que a recebeu ainda está aberta
+        """
+        with self._lock:
+            sessao = self._sessoes.get(id_sessao)
+            if sessao is None:
+                return None
+            usuario, expira, dono_atual = sessao
+            # Link copiado enquanto o usuário está conectado: recusa sem derrubar a sessão dele
+            if (dono_atual is not None and dono_atual != dono
+                    and self.sessao_ativa is not None and self.sessao_ativa(dono_atual)):
+                return None
+            del self._sessoes[id_sessao]
+        if expira < time.time():
+            return None
+        return usuario
+
+    def revogar(self, id_sessao):
+        with self._lock:
+            self._sessoes.pop(id_sessao, None)
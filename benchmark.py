@@ -0,0 +1,126 @@
+# ====================================
+# ⏱️ BENCHMARK COM DADOS SINTÉTICOS
+# ====================================
+# Popula um banco SQLite em memória com produção/desperdício sintéticos
+# e mede os caminhos principais do app (alertas, estoque, relatório,
+# análises, exportação e login), para pegar regressões de escala sem Supabase.
+#
+# Uso:
+#   python benchmark.py                  # 10k, 100k e 1M linhas
+#   python benchmark.py 10000 50000      # tamanhos escolhidos
+# ====================================
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+
+from alertas import IndiceValidade, gerar_alertas
+from analises import piores_produtos, por_motivo, serie_periodo
+from autenticacao import autenticar, hash_senha
+from dados import CacheTabelas, COLUNAS_RELATORIO, buscar_periodo, filtros_periodo, iterar_paginas
+from estoque import AlocadorFIFO
+from exportacao import exportar
+from registros import montar_producao
+from repositorio import RepositorioSQLite
+
+TAMANHOS = [10_000, 100_000, 1_000_000]
+PRODUTOS = [f"Produto {i:02d}" for i in range(60)]
+MOTIVOS = ["vencido", "queimado", "caiu no chão", "avaria", None]
+TOTAL_USUARIOS = 200
+LOTE_SEMEADURA = 10_000
+
+
+def semear(repo, linhas, dias=365, semente=42):
+    """Produção espalhada por `dias` dias até hoje, ~20% dos lotes com desperdício"""
+    aleatorio = random.Random(semente)
+    inicio = datetime.now() - timedelta(days=dias)
+    passo = timedelta(days=dias) / linhas
+    for i in range(0, linhas, LOTE_SEMEADURA):
+        lote = [
+            montar_producao(aleatorio.choice(PRODUTOS), aleatorio.randint(5, 60), inicio + passo * j)
+            for j in range(i, min(i + LOTE_SEMEADURA, linhas))
+        ]
+        inseridas = repo.inserir("producao", lote)
+        repo.inserir("desperdicio", [
+            {
+                "data_desperdicio": p["data_producao"],
+                "produto": p["produto"],
+                "cor": p["cor"],
+                "quantidade_desperdicada": aleatorio.randint(1, p["quantidade_produzida"]),
+                "motivo": aleatorio.choice(MOTIVOS),
+                "id_producao": p["id"],
+            }
+            for p in inseridas if aleatorio.random() < 0.2
+        ])
+    # rounds baixo só para semear rápido; o último usuário tem o custo padrão (medido em "login")
+    senha = bcrypt.hashpw(b"senha", bcrypt.gensalt(rounds=4)).decode("utf-8")
+    repo.inserir("usuarios", [
+        {"nome": f"Usuário {i}", "usuario": f"usuario{i}", "senha": senha, "tipo": "usuario"}
+        for i in range(TOTAL_USUARIOS - 1)
+    ] + [{"nome": "Usuário real", "usuario": "usuario_real", "senha": hash_senha("senha"), "tipo": "usuario"}])
+
+
+def cronometrar(resultados, nome, funcao):
+    inicio = time.perf_counter()
+    retorno = funcao()
+    resultados.append((nome, time.perf_counter() - inicio))
+    return retorno
+
+
+def medir(linhas):
+    repo = RepositorioSQLite(":memory:")
+    resultados = []
+    cronometrar(resultados, "semear", lambda: semear(repo, linhas))
+
+    cache = CacheTabelas(repo, ttl=3600, max_mb=4096)
+    cronometrar(resultados, "carga producao (fria)", lambda: cache.obter("producao"))
+    cronometrar(resultados, "carga producao (cache)", lambda: cache.obter("producao"))
+    indice = cronometrar(resultados, "índice de validade", lambda: cache.derivado("producao", IndiceValidade))
+    cronometrar(resultados, "alertas", lambda: gerar_alertas(indice, limite=30))
+
+    cronometrar(resultados, "estoque por produto", lambda: cache.obter("estoque_produtos"))
+    cronometrar(resultados, "estoque por lote", lambda: cache.obter("estoque_lotes"))
+    cronometrar(resultados, "alocador FIFO", lambda: cache.derivado("estoque_lotes", AlocadorFIFO))
+
+    fim = datetime.now().date()
+    ini = fim - timedelta(days=7)
+    colunas = COLUNAS_RELATORIO["producao"]
+    cronometrar(resultados, "relatório 7 dias", lambda: buscar_periodo(repo, "producao", "data_producao", ini, fim, colunas))
+
+    def analisar_ano():
+        ini_ano = fim - timedelta(days=365)
+        resumo = buscar_periodo(repo, "resumo_diario", "data", ini_ano, fim)
+        motivos = buscar_periodo(repo, "resumo_motivos", "data", ini_ano, fim)
+        return serie_periodo(resumo, "W-MON", 4), piores_produtos(resumo), por_motivo(motivos)
+    cronometrar(resultados, "análises 365 dias (resumos)", analisar_ano)
+
+    ini_mes = fim - timedelta(days=30)
+    for extensao in ("csv", "xlsx", "parquet"):
+        def exportar_mes():
+            with tempfile.TemporaryFile() as arquivo:
+                paginas = iterar_paginas(repo, "producao", colunas, filtros_periodo("data_producao", ini_mes, fim))
+                return exportar(paginas, extensao, arquivo, colunas)
+        cronometrar(resultados, f"exportação 30 dias ({extensao})", exportar_mes)
+
+    cronometrar(resultados, "login (consulta, rounds=4)", lambda: autenticar(repo, f"usuario{TOTAL_USUARIOS - 2}", "senha"))
+    cronometrar(resultados, "login (bcrypt padrão)", lambda: autenticar(repo, "usuario_real", "senha"))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos principais com backend SQLite local.")
+    parser.add_argument("tamanhos", nargs="*", type=int, default=TAMANHOS, help="linhas de produção a semear")
+    args = parser.parse_args()
+
+    for linhas in args.tamanhos:
+        print(f"\n=== {linhas:,} linhas de produção ===".replace(",", "."))
+        for nome, segundos in medir(linhas):
+            print(f"{nome:<32} {segundos * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+# ====================================
+# 🗄️ CAMADA DE DADOS
+# ====================================
+# Acesso às tabelas (via repositorio.Repositorio) com cache compartilhado
+# entre sessões e sincronização incremental (só as linhas novas/alteradas).
+# Não depende do Streamlit: o app cria uma única instância via
+# st.cache_resource e todas as sessões usam o mesmo cache.
+# ====================================
+
+import contextvars
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import pandas as pd
+
+
+TAMANHO_PAGINA = 1000  # limite padrão de linhas por requisição do PostgREST
+TAMANHO_LOTE_INSERT = 500  # linhas por requisição nos inserts em lote
+MAX_LEITURAS_SIMULTANEAS = 8
+
+# Pool compartilhado por todas as sessões para leituras independentes
+_pool_leituras = ThreadPoolExecutor(max_workers=MAX_LEITURAS_SIMULTANEAS, thread_name_prefix="leitura")
+
+# chave: coluna única usada na paginação
+# incremental: busca só linhas novas (id crescente); alteracao: coluna de "última alteração"
+# filtros: aplicados no banco em toda leitura (o snapshot guarda só essas linhas)
+TABELAS = {
+    "producao": {"chave": "id", "incremental": True, "alteracao": "data_remarcacao"},
+    "desperdicio": {"chave": "id", "incremental": True},
+    # Livro de estoque (sql/*/001_estoque.sql), atualizado por triggers e relido a cada mudança:
+    # só os lotes com saldo (índice parcial em sql/*/006_estoque_abertos.sql), que são os que o
+    # Estoque, o alocador FIFO e a remarcação usam; o tamanho acompanha o estoque, não o histórico
+    "estoque_lotes": {"chave": "id_producao", "filtros": [("estoque_atual", "gt", 0)]},
+    "estoque_produtos": {"chave": "produto"},
+}
+
+# Tabelas derivadas que mudam quando a tabela de origem recebe escrita
+DEPENDENTES = {
+    "producao": ("estoque_lotes", "estoque_produtos"),
+    "desperdicio": ("estoque_lotes", "estoque_produtos"),
+}
+
+
+# Layout fixo dos snapshots, aplicado uma vez ao carregar: texto repetido vira
+# categoria, quantidades int32 e datas datetime64 (sem reconverter a cada rerun)
+CATEGORIAS = ("produto", "cor", "motivo")
+QUANTIDADES = ("quantidade_produzida", "quantidade_desperdicada", "estoque_atual")
+DATAS = ("data_producao", "data_validade", "data_remarcacao", "data_desperdicio", "data")
+# Colunas só de controle, que não entram nos snapshots (ex.: chave de idempotência da fila de escrita)
+COLUNAS_INTERNAS = ("chave_idempotencia",)
+
+
+# Colunas exibidas/exportadas nos relatórios (o "id" é necessário para a paginação)
+COLUNAS_RELATORIO = {
+    "producao": ["id", "data_producao", "produto", "cor", "quantidade_produzida", "data_remarcacao", "data_validade"],
+    "desperdicio": ["id", "data_desperdicio", "produto", "cor", "quantidade_desperdicada", "motivo", "id_producao"],
+}
+
+
+def tipar(df):
+    """Converte as colunas conhecidas para o layout compacto (colunas já convertidas ficam como estão)"""
+    df = df.drop(columns=[c for c in COLUNAS_INTERNAS if c in df.columns])
+    convertidas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if coluna in CATEGORIAS and not isinstance(serie.dtype, pd.CategoricalDtype):
+            convertidas[coluna] = serie.astype("category")
+        elif coluna in QUANTIDADES and serie.dtype.name not in ("int32", "Int32"):
+            numeros = pd.to_numeric(serie, errors="coerce")
+            convertidas[coluna] = numeros.astype("Int32" if numeros.isna().any() else "int32")
+        elif coluna in DATAS and not pd.api.types.is_datetime64_any_dtype(serie):
+            convertidas[coluna] = pd.to_datetime(serie, errors="coerce", format="ISO8601")
+    return df.assign(**convertidas) if convertidas else df
+
+
+def concatenar(df, delta):
+    """concat que preserva as categorias (une as das duas partes em vez de cair para object)"""
+    for coluna in CATEGORIAS:
+        if coluna in df.columns and coluna in delta.columns:
+            categorias = df[coluna].cat.categories.union(delta[coluna].cat.categories)
+            df = df.assign(**{coluna: df[coluna].cat.set_categories(categorias)})
+            delta = delta.assign(**{coluna: delta[coluna].cat.set_categories(categorias)})
+    return pd.concat([df, delta], ignore_index=True)
+
+
+def nomes_produtos(df):
+    """Produtos do snapshot em ordem alfabética (as categorias da coluna, sem copiar as linhas)"""
+    if "produto" not in df.columns:
+        return []
+    return sorted(df["produto"].cat.categories)
+
+
+def registros_json(df):
+    """Linhas do DataFrame como dicts prontos para JSON, convertendo coluna a coluna"""
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            valores = serie.dt.strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            valores = serie
+        # object + tolist(): numpy/pandas escalares viram int/float/str do Python; nulos viram None
+        colunas[coluna] = valores.astype(object).where(serie.notna(), None).tolist()
+    return [dict(zip(colunas, linha)) for linha in zip(*colunas.values())]
+
+
+def ler_em_paralelo(tarefas, timeout=None):
+    """Executa leituras independentes ao mesmo tempo: {nome: função} -> (resultados, falhas)
+
+    Uma leitura que falha ou passa do timeout vai para `falhas` sem derrubar as outras.
+    """
+    # Cada tarefa roda numa cópia do contexto atual (mantém o rastro de desempenho do rerun)
+    futuros = {
+        nome: _pool_leituras.submit(contextvars.copy_context().run, funcao)
+        for nome, funcao in tarefas.items()
+    }
+    concluidos, _ = wait(futuros.values(), timeout=timeout)
+    resultados, falhas = {}, {}
+    for nome, futuro in futuros.items():
+        if futuro not in concluidos:
+            falhas[nome] = TimeoutError(f"sem resposta em {timeout}s")
+        elif futuro.exception() is not None:
+            falhas[nome] = futuro.exception()
+        else:
+            resultados[nome] = futuro.result()
+    return resultados, falhas
+
+
+def iterar_paginas(repo, tabela, colunas=None, filtros=(), chave="id", tamanho_pagina=TAMANHO_PAGINA):
+    """Percorre uma consulta em páginas ordenadas pela chave (keyset), uma lista de linhas por vez"""
+    ultima = None
+    while True:
+        filtros_pagina = list(filtros) if ultima is None else [*filtros, (chave, "gt", ultima)]
+        pagina = repo.selecionar(tabela, colunas, filtros_pagina, ordem=chave, limite=tamanho_pagina)
+        if pagina:
+            yield pagina
+        if len(pagina) < tamanho_pagina:
+            return
+        ultima = pagina[-1][chave]
+
+
+def buscar_paginado(repo, tabela, colunas=None, filtros=(), chave="id", tamanho_pagina=TAMANHO_PAGINA):
+    """Busca todas as linhas de uma consulta em páginas ordenadas pela chave (keyset)"""
+    paginas = iterar_paginas(repo, tabela, colunas, filtros, chave, tamanho_pagina)
+    return [linha for pagina in paginas for linha in pagina]
+
+
+def filtros_periodo(campo_data, ini, fim, produtos=None):
+    """Filtros de um período (e produtos) para serem aplicados no próprio banco"""
+    # fim + 1 dia com lt: inclui o dia final inteiro quando o campo tem hora
+    filtros = [(campo_data, "gte", ini.isoformat()), (campo_data, "lt", (fim + timedelta(days=1)).isoformat())]
+    if produtos:
+        filtros.append(("produto", "in", list(produtos)))
+    return filtros
+
+
+def buscar_periodo(repo, tabela, campo_data, ini, fim, colunas=None, produtos=None):
+    """Busca só as linhas do período (e produtos) escolhidos, em páginas"""
+    linhas = buscar_paginado(repo, tabela, colunas, filtros_periodo(campo_data, ini, fim, produtos))
+    return tipar(pd.DataFrame(linhas, columns=colunas))
+
+
+def inserir_em_lotes(repo, tabela, linhas, tamanho_lote=TAMANHO_LOTE_INSERT):
+    """Insere as linhas em poucas requisições (uma por lote de `tamanho_lote`)"""
+    inseridas = []
+    for i in range(0, len(linhas), tamanho_lote):
+        inseridas.extend(repo.inserir(tabela, linhas[i:i + tamanho_lote]))
+    return inseridas
+
+
+class SincronizadorTabela:
+    """Mantém uma cópia local da tabela e busca só o que mudou desde a última leitura"""
+
+    def __init__(self, repo, tabela, chave="id", incremental=False, alteracao=None, filtros=()):
+        self.repo = repo
+        self.tabela = tabela
+        self.chave = chave
+        self.incremental = incremental
+        self.coluna_alteracao = alteracao
+        self.filtros = list(filtros)
+        self.df = pd.DataFrame()
+
+    def _buscar(self, *filtros):
+        return buscar_paginado(self.repo, self.tabela, filtros=[*self.filtros, *filtros], chave=self.chave)
+
+    def recarregar(self):
+        """Descarta a cópia local e baixa a tabela inteira"""
+        self.df = tipar(pd.DataFrame(self._buscar()))
+        return self.df
+
+    def atualizar(self):
+        """Aplica as inserções/alterações novas; recarrega tudo se detectar exclusões"""
+        if not self.incremental or self.df.empty or "id" not in self.df.columns:
+            return self.recarregar()
+
+        ultimo_id = int(self.df["id"].max())
+        novas = self._buscar(("id", "gt", ultimo_id))
+
+        alteradas = []
+        col = self.coluna_alteracao
+        if col and col in self.df.columns and self.df[col].notna().any():
+            marca = self.df[col].max().strftime("%Y-%m-%d %H:%M:%S")
+            # gte: alterações no mesmo segundo da marca também voltam (o merge por id deduplica)
+            alteradas = self._buscar((col, "gte", marca), ("id", "lte", ultimo_id))
+        elif col:
+            alteradas = self._buscar((col, "not_null", None), ("id", "lte", ultimo_id))
+
+        if novas or alteradas:
+            delta = tipar(pd.DataFrame(alteradas + novas))
+            self.df = (
+                concatenar(self.df, delta)
+                .drop_duplicates(subset="id", keep="last")
+                .sort_values("id", ignore_index=True)
+            )
+
+        # Exclusões (Zerar Sistema, arquivamento, remoções manuais) não aparecem no delta.
+        # Conta só até o maior id da cópia local: inserts posteriores não compensam uma
+        # exclusão do mesmo tamanho (ids novos são sempre maiores)
+        maior_id = int(self.df["id"].max())
+        if self.repo.contar(self.tabela, [("id", "lte", maior_id)]) != len(self.df):
+            return self.recarregar()
+        return self.df
+
+
+def memoria_objeto(obj):
+    """Bytes aproximados de um derivado do cache (objetos podem informar via memoria())"""
+    if hasattr(obj, "memoria"):
+        return int(obj.memoria())
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(sys.getsizeof(item) for item in obj)
+    return sys.getsizeof(obj)
+
+
+class CacheTabelas:
+    """Snapshots das tabelas compartilhados entre sessões, com TTL e limite de memória"""
+
+    def __init__(self, repo, ttl=60, max_mb=256):
+        self.repo = repo
+        self.ttl = ttl
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entradas = OrderedDict()  # tabela -> [instante, sincronizador, bytes, derivados]
+        self._lock = threading.Lock()
+        self._locks_tabela = {}
+        self._geracoes = {}  # tabela -> nº de invalidações, para não perder as que chegam durante a busca
+
+    def _lock_da_tabela(self, tabela):
+        with self._lock:
+            return self._locks_tabela.setdefault(tabela, threading.Lock())
+
+    def _entrada_atual(self, tabela):
+        # Chamar com o lock da tabela: várias sessões pedindo ao mesmo tempo geram uma única busca
+        with self._lock:
+            entrada = self._entradas.get(tabela)
+            if entrada and time.monotonic() - entrada[0] < self.ttl:
+                self._entradas.move_to_end(tabela)
+                return entrada
+            geracao = self._geracoes.setdefault(tabela, 0)
+
+        if entrada:
+            sinc = entrada[1]
+        else:
+            sinc = SincronizadorTabela(self.repo, tabela, **TABELAS.get(tabela, {}))
+        df = sinc.atualizar()
+        tamanho = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            # Invalidada durante a busca: o snapshot pode não ter a escrita, já nasce vencido
+            instante = time.monotonic() if self._geracoes[tabela] == geracao else float("-inf")
+            entrada = [instante, sinc, tamanho, {}]
+            self._entradas[tabela] = entrada
+            self._entradas.move_to_end(tabela)
+            self._liberar_memoria()
+        return entrada
+
+    def obter(self, tabela):
+        """Retorna uma cópia do snapshot da tabela, sincronizando com o banco só se expirou"""
+        with self._lock_da_tabela(tabela):
+            return self._entrada_atual(tabela)[1].df.copy()
+
+    def aquecer(self, tabelas, timeout=None):
+        """Sincroniza várias tabelas em paralelo (sem copiar); retorna {tabela: erro} das que falharam"""
+        def sincronizar(tabela):
+            with self._lock_da_tabela(tabela):
+                self._entrada_atual(tabela)
+
+        _, falhas = ler_em_paralelo({t: (lambda t=t: sincronizar(t)) for t in dict.fromkeys(tabelas)}, timeout)
+        return falhas
+
+    def derivado(self, tabela, construir, chave=None):
+        """Objeto construído a partir do snapshot (índices, heaps...), refeito só quando o snapshot é atualizado
+
+        construir(df) recebe o snapshot compartilhado e não deve alterá-lo. `chave`
+        identifica o derivado quando construir é recriado a cada rerun (ex.: lambda);
+        por padrão é o próprio construir.
+        """
+        chave = construir if chave is None else chave
+        with self._lock_da_tabela(tabela):
+            entrada = self._entrada_atual(tabela)
+            if chave not in entrada[3]:
+                entrada[3][chave] = construir(entrada[1].df)
+                # O derivado conta no tamanho da entrada, junto com o snapshot
+                with self._lock:
+                    entrada[2] += memoria_objeto(entrada[3][chave])
+                    self._liberar_memoria()
+            return entrada[3][chave]
+
+    def _liberar_memoria(self):
+        # Remove as tabelas menos usadas até caber no limite (mantém sempre a mais recente)
+        total = sum(e[2] for e in self._entradas.values())
+        while total > self.max_bytes and len(self._entradas) > 1:
+            _, (_, _, tamanho, _) = self._entradas.popitem(last=False)
+            total -= tamanho
+
+    def invalidar(self, *tabelas):
+        """Marca os snapshots (ou todos) como vencidos após insert/update/delete"""
+        tabelas = [t for tabela in tabelas for t in (tabela, *DEPENDENTES.get(tabela, ()))]
+        with self._lock:
+            for tabela in tabelas or list(self._geracoes):
+                self._geracoes[tabela] = self._geracoes.get(tabela, 0) + 1
+                if tabela in self._entradas:
+                    # Mantém a cópia local: a próxima leitura busca só o delta
+                    self._entradas[tabela][0] = float("-inf")
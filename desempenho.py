@@ -0,0 +1,180 @@
+# ====================================
+# ⏱️ INSTRUMENTAÇÃO DE DESEMPENHO
+# ====================================
+# Cada rerun do app gera um "rastro" com a duração das etapas nomeadas
+# (alertas, estoque, relatório, exportação...) e de cada chamada ao banco
+# (linhas e bytes transferidos). Os rastros ficam num histórico
+# compartilhado, com percentis por etapa e exportação em JSON lines.
+# ====================================
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pandas as pd
+
+from repositorio import Repositorio
+
+AMOSTRA_BYTES = 20  # linhas serializadas para estimar o tamanho da resposta
+
+_rastro_atual = ContextVar("rastro_atual", default=None)
+
+
+class Rastro:
+    """Eventos medidos durante um rerun"""
+
+    def __init__(self, pagina=None, usuario=None):
+        self.inicio = time.time()
+        self.pagina = pagina
+        self.usuario = usuario
+        self.duracao_ms = None
+        self.eventos = []
+        self._lock = threading.Lock()
+
+    def registrar(self, tipo, nome, segundos, linhas=None, bytes_=None):
+        with self._lock:
+            self.eventos.append({
+                "tipo": tipo, "nome": nome, "duracao_ms": round(segundos * 1000, 2),
+                "linhas": linhas, "bytes": bytes_,
+            })
+
+    def como_dict(self):
+        return {
+            "inicio": self.inicio, "pagina": self.pagina, "usuario": self.usuario,
+            "duracao_ms": self.duracao_ms, "eventos": list(self.eventos),
+        }
+
+
+def rastro_atual():
+    return _rastro_atual.get()
+
+
+@contextmanager
+def etapa(nome):
+    """Mede uma etapa do rerun; defina medida["linhas"] dentro do bloco para registrar o volume"""
+    medida = {"linhas": None}
+    inicio = time.perf_counter()
+    try:
+        yield medida
+    finally:
+        rastro = _rastro_atual.get()
+        if rastro is not None:
+            rastro.registrar("etapa", nome, time.perf_counter() - inicio, medida["linhas"])
+
+
+def _estimar_bytes(linhas):
+    if not linhas:
+        return 0
+    amostra = linhas[:AMOSTRA_BYTES]
+    return int(len(json.dumps(amostra, default=str)) / len(amostra) * len(linhas))
+
+
+class RepositorioInstrumentado(Repositorio):
+    """Envolve outro repositório registrando tempo, linhas e bytes (estimados) de cada chamada"""
+
+    def __init__(self, repo):
+        self.repo = repo
+
+    def __getattr__(self, nome):
+        # Atributos específicos do backend (ex.: planilha do Sheets)
+        return getattr(self.repo, nome)
+
+    def _medir(self, operacao, tabela, funcao, *args, linhas_enviadas=None):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        rastro = _rastro_atual.get()
+        if rastro is not None:
+            dados = linhas_enviadas if linhas_enviadas is not None else resultado
+            linhas = len(dados) if isinstance(dados, list) else None
+            rastro.registrar(
+                "dados", f"{operacao} {tabela}", time.perf_counter() - inicio,
+                linhas, _estimar_bytes(dados) if isinstance(dados, list) else None,
+            )
+        return resultado
+
+    def selecionar(self, tabela, colunas=None, filtros=(), ordem=None, limite=None):
+        return self._medir("selecionar", tabela, self.repo.selecionar, tabela, colunas, filtros, ordem, limite)
+
+    def contar(self, tabela, filtros=()):
+        return self._medir("contar", tabela, self.repo.contar, tabela, filtros)
+
+    def inserir(self, tabela, linhas):
+        return self._medir("inserir", tabela, self.repo.inserir, tabela, linhas, linhas_enviadas=linhas)
+
+    def inserir_idempotente(self, tabela, linhas, chave="chave_idempotencia"):
+        return self._medir("inserir", tabela, self.repo.inserir_idempotente, tabela, linhas, chave, linhas_enviadas=linhas)
+
+    def atualizar(self, tabela, valores, filtros):
+        return self._medir("atualizar", tabela, self.repo.atualizar, tabela, valores, filtros)
+
+    def excluir(self, tabela, filtros):
+        return self._medir("excluir", tabela, self.repo.excluir, tabela, filtros)
+
+    def remarcar_lotes(self, itens, agora):
+        itens = list(itens)
+        return self._medir("remarcar_lotes", "producao", self.repo.remarcar_lotes, itens, agora, linhas_enviadas=itens)
+
+
+class HistoricoDesempenho:
+    """Últimos rastros de todas as sessões, com percentis e exportação JSONL"""
+
+    def __init__(self, max_rastros=2000, arquivo=None):
+        self._rastros = deque(maxlen=max_rastros)
+        self._lock = threading.Lock()
+        self.arquivo = arquivo
+
+    @contextmanager
+    def rastrear(self, pagina=None, usuario=None):
+        """Ativa um rastro novo durante o bloco e o guarda no histórico ao final"""
+        rastro = Rastro(pagina, usuario)
+        token = _rastro_atual.set(rastro)
+        inicio = time.perf_counter()
+        try:
+            yield rastro
+        finally:
+            # Também roda quando o Streamlit interrompe o script (st.rerun/st.stop)
+            _rastro_atual.reset(token)
+            rastro.duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+            self.registrar(rastro)
+
+    def registrar(self, rastro):
+        registro = rastro.como_dict()
+        with self._lock:
+            self._rastros.append(registro)
+            if self.arquivo:
+                with open(self.arquivo, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, default=str) + "\n")
+
+    def rastros(self):
+        with self._lock:
+            return list(self._rastros)
+
+    def eventos(self):
+        """Um evento por linha, com a página e o instante do rerun (inclui o total do rerun)"""
+        linhas = []
+        for rastro in self.rastros():
+            base = {"inicio": pd.to_datetime(rastro["inicio"], unit="s"), "pagina": rastro["pagina"]}
+            linhas.append({**base, "tipo": "rerun", "nome": "rerun", "duracao_ms": rastro["duracao_ms"],
+                           "linhas": None, "bytes": None})
+            linhas.extend({**base, **evento} for evento in rastro["eventos"])
+        return pd.DataFrame(linhas, columns=["inicio", "pagina", "tipo", "nome", "duracao_ms", "linhas", "bytes"])
+
+    def percentis(self):
+        """Contagem, p50, p95, p99 e máximo (ms) de cada etapa/chamada, além de linhas e bytes médios"""
+        eventos = self.eventos()
+        if eventos.empty:
+            return pd.DataFrame()
+        grupos = eventos.groupby(["tipo", "nome"])
+        resumo = grupos["duracao_ms"].describe(percentiles=[0.5, 0.95, 0.99])
+        resumo = resumo[["count", "50%", "95%", "99%", "max"]].rename(
+            columns={"count": "n", "50%": "p50_ms", "95%": "p95_ms", "99%": "p99_ms", "max": "max_ms"}
+        )
+        resumo["linhas_média"] = grupos["linhas"].mean()
+        resumo["bytes_média"] = grupos["bytes"].mean()
+        return resumo.reset_index().sort_values("p95_ms", ascending=False)
+
+    def jsonl(self):
+        return "".join(json.dumps(r, default=str) + "\n" for r in self.rastros())
@@ -0,0 +1,109 @@
+# ====================================
+# 📦 ESTOQUE POR LOTE
+# ====================================
+# Alocação FIFO do desperdício: para cada produto, um heap dos lotes
+# abertos ordenado pela data de validade. Registrar desperdício consome
+# primeiro o lote que vence antes, dividindo entre lotes se faltar saldo.
+# ====================================
+
+import heapq
+import sys
+import threading
+
+import pandas as pd
+
+
+class AlocadorFIFO:
+    """Lotes com saldo por produto, em heaps ordenados por (validade, id)"""
+
+    def __init__(self, estoque_lotes, reservado=None):
+        """reservado: {id_producao: quantidade} já consumida mas que o banco ainda não descontou"""
+        self._heaps = {}
+        self._lock = threading.Lock()
+        if estoque_lotes.empty:
+            return
+        reservado = reservado or {}
+        abertos = estoque_lotes[estoque_lotes["estoque_atual"] > 0]
+        for produto, validade, id_producao, cor, saldo in zip(
+            abertos["produto"], abertos["data_validade"], abertos["id_producao"], abertos["cor"], abertos["estoque_atual"]
+        ):
+            saldo = int(saldo) - reservado.get(int(id_producao), 0)
+            if saldo <= 0:
+                continue
+            # Lotes sem validade vão para o fim da fila
+            chave = (validade is None or validade != validade, str(validade), int(id_producao))
+            self._heaps.setdefault(produto, []).append([chave, saldo, cor])
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+    def memoria(self):
+        """Bytes aproximados dos heaps (entra no limite de memória do CacheTabelas)"""
+        with self._lock:
+            return sum(
+                sys.getsizeof(heap) + sum(
+                    sys.getsizeof(lote) + sys.getsizeof(lote[0]) + sys.getsizeof(lote[0][1]) + sys.getsizeof(lote[2])
+                    for lote in heap
+                )
+                for heap in self._heaps.values()
+            )
+
+    def produtos(self):
+        """Produtos com algum lote em estoque"""
+        with self._lock:
+            return sorted(p for p, heap in self._heaps.items() if heap)
+
+    def alocar(self, produto, quantidade):
+        """Consome `quantidade` dos lotes do produto em ordem de validade
+
+        Retorna [(id_producao, cor, quantidade), ...]. Sem saldo suficiente levanta
+        ValueError e não altera nada.
+        """
+        with self._lock:
+            heap = self._heaps.get(produto, [])
+            retirados = []
+            restante = quantidade
+            while restante > 0 and heap:
+                lote = heapq.heappop(heap)
+                retirados.append(lote)
+                restante -= lote[1]
+            if restante > 0:
+                for lote in retirados:
+                    heapq.heappush(heap, lote)
+                raise ValueError(f"Quantidade excede o estoque de {produto} ({quantidade - restante}).")
+
+            alocacao = []
+            restante = quantidade
+            for chave, saldo, cor in retirados:
+                usado = min(saldo, restante)
+                alocacao.append((chave[2], cor, usado))
+                restante -= usado
+                if saldo > usado:
+                    heapq.heappush(heap, [chave, saldo - usado, cor])
+            return alocacao
+
+
+def calcular_estoque_lotes(producao, desperdicio):
+    """Saldo por lote em memória (mesma regra de sql/*/001_estoque.sql), para backends sem triggers"""
+    colunas = ["id_producao", "produto", "cor", "data_validade",
+               "quantidade_produzida", "quantidade_desperdicada", "estoque_atual"]
+    if producao.empty:
+        return pd.DataFrame(columns=colunas)
+    lotes = producao.rename(columns={"id": "id_producao"})
+    if desperdicio.empty:
+        lotes = lotes.assign(quantidade_desperdicada=0)
+    else:
+        por_lote = desperdicio.groupby("id_producao")["quantidade_desperdicada"].sum()
+        lotes = lotes.assign(
+            quantidade_desperdicada=lotes["id_producao"].map(por_lote).fillna(0).astype("int64")
+        )
+    lotes = lotes.assign(estoque_atual=lotes["quantidade_produzida"] - lotes["quantidade_desperdicada"])
+    return lotes[colunas]
+
+
+def calcular_estoque_produtos(estoque_lotes):
+    """Totais por produto a partir dos saldos por lote"""
+    return (
+        estoque_lotes.groupby("produto", as_index=False)[
+            ["quantidade_produzida", "quantidade_desperdicada", "estoque_atual"]
+        ].sum()
+    )
@@ -0,0 +1,83 @@
+# ====================================
+# 📥 EXPORTAÇÃO DE RELATÓRIOS
+# ====================================
+# Grava o relatório página por página direto do banco para o arquivo,
+# sem montar o DataFrame inteiro: a memória usada depende do tamanho
+# da página, não do período exportado.
+# ====================================
+
+import gzip
+import io
+
+import pandas as pd
+
+# rótulo na tela -> (extensão, mime)
+FORMATOS = {
+    "Excel (.xlsx)": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV (.csv)": ("csv", "text/csv"),
+    "CSV compactado (.csv.gz)": ("csv.gz", "application/gzip"),
+    "Parquet (.parquet)": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _exportar_csv(paginas, arquivo, colunas, compactar=False):
+    saida = gzip.GzipFile(fileobj=arquivo, mode="wb") if compactar else arquivo
+    texto = io.TextIOWrapper(saida, encoding="utf-8", newline="")
+    total = 0
+    texto.write(",".join(colunas) + "\n")
+    for pagina in paginas:
+        pd.DataFrame(pagina, columns=colunas).to_csv(texto, header=False, index=False)
+        total += len(pagina)
+    texto.flush()
+    texto.detach()  # não fecha o arquivo de destino
+    if compactar:
+        saida.close()
+    return total
+
+
+def _exportar_xlsx(paginas, arquivo, colunas):
+    import xlsxwriter
+
+    # constant_memory: cada linha vai para o disco assim que a próxima começa
+    livro = xlsxwriter.Workbook(arquivo, {"constant_memory": True})
+    planilha = livro.add_worksheet()
+    planilha.write_row(0, 0, colunas)
+    total = 0
+    for pagina in paginas:
+        for linha in pagina:
+            total += 1
+            planilha.write_row(total, 0, [linha.get(c) for c in colunas])
+    livro.close()
+    return total
+
+
+def _exportar_parquet(paginas, arquivo, colunas):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    total = 0
+    for pagina in paginas:
+        tabela = pa.Table.from_pylist(pagina).select(colunas)
+        if escritor is None:
+            # Colunas só com nulos na 1ª página viram texto para aceitar valores depois
+            esquema = pa.schema([
+                pa.field(c.name, pa.string()) if pa.types.is_null(c.type) else c
+                for c in tabela.schema
+            ])
+            escritor = pq.ParquetWriter(arquivo, esquema, compression="zstd")
+        escritor.write_table(tabela.cast(escritor.schema))
+        total += len(pagina)
+    if escritor is None:
+        escritor = pq.ParquetWriter(arquivo, pa.schema([(c, pa.string()) for c in colunas]), compression="zstd")
+    escritor.close()
+    return total
+
+
+def exportar(paginas, extensao, arquivo, colunas):
+    """Grava as páginas (listas de linhas) no arquivo binário aberto; retorna o nº de linhas"""
+    if extensao == "xlsx":
+        return _exportar_xlsx(paginas, arquivo, colunas)
+    if extensao == "parquet":
+        return _exportar_parquet(paginas, arquivo, colunas)
+    return _exportar_csv(paginas, arquivo, colunas, compactar=extensao == "csv.gz")
@@ -0,0 +1,176 @@
+# ====================================
+# 📤 FILA DE ESCRITA (WRITE-BEHIND)
+# ====================================
+# Os registros de produção e desperdício são gravados primeiro num
+# diário SQLite local (modo WAL) e confirmados na hora para o operador.
+# Uma thread em segundo plano envia os pendentes ao banco em lotes,
+# com novas tentativas (espera crescente) e uma chave de idempotência
+# por linha: reenviar um lote que já tinha chegado não duplica nada
+# (índice único em chave_idempotencia, sql/*/005_idempotencia.sql).
+# ====================================
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from dados import TAMANHO_LOTE_INSERT
+
+INTERVALO_ENVIO = 2  # segundos entre verificações da fila
+ESPERA_MAXIMA = 300  # teto da espera entre tentativas (segundos)
+MANTER_ENVIADOS_DIAS = 7  # histórico de enviados exibido na tela
+
+CHAVE_IDEMPOTENCIA = "chave_idempotencia"
+
+
+def _agora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class FilaEscrita:
+    """Diário local de inserts pendentes, descarregado no repositório por uma thread"""
+
+    def __init__(self, repo, caminho="fila_escrita.db", tamanho_lote=TAMANHO_LOTE_INSERT,
+                 intervalo=INTERVALO_ENVIO, ao_enviar=None):
+        self.repo = repo
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.ao_enviar = ao_enviar  # chamado com o nome da tabela após cada lote confirmado
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self.conexao.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self.conexao:
+            # WAL: gravar na fila não espera leituras; FULL: confirmado = está no disco
+            self.conexao.execute("PRAGMA journal_mode=WAL")
+            self.conexao.execute("PRAGMA synchronous=FULL")
+            self.conexao.execute("""
+                CREATE TABLE IF NOT EXISTS fila (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chave TEXT NOT NULL UNIQUE,
+                    tabela TEXT NOT NULL,
+                    linha TEXT NOT NULL,
+                    criado_em TEXT NOT NULL,
+                    enviado_em TEXT,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    proxima_tentativa REAL NOT NULL DEFAULT 0,
+                    erro TEXT
+                )
+            """)
+            self.conexao.execute("CREATE INDEX IF NOT EXISTS fila_pendentes ON fila (enviado_em, id)")
+        self._acordar = threading.Event()
+        self._thread = threading.Thread(target=self._trabalhar, name="fila-escrita", daemon=True)
+        self._thread.start()
+
+    def _executar(self, sql, parametros=()):
+        with self._lock, self.conexao:
+            return [dict(linha) for linha in self.conexao.execute(sql, parametros).fetchall()]
+
+    def enfileirar(self, tabela, linhas):
+        """Grava as linhas no diário local e retorna na hora as chaves de idempotência"""
+        criado_em = _agora()
+        itens = [(uuid.uuid4().hex, linha) for linha in linhas]
+        with self._lock, self.conexao:
+            self.conexao.executemany(
+                "INSERT INTO fila (chave, tabela, linha, criado_em) VALUES (?, ?, ?, ?)",
+                [(chave, tabela, json.dumps({**linha, CHAVE_IDEMPOTENCIA: chave}), criado_em) for chave, linha in itens],
+            )
+        self._acordar.set()
+        return [chave for chave, _ in itens]
+
+    def acordar(self):
+        """Pede um envio imediato (ignora a espera entre tentativas)"""
+        self._executar("UPDATE fila SET proxima_tentativa = 0 WHERE enviado_em IS NULL")
+        self._acordar.set()
+
+    def _trabalhar(self):
+        while True:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            try:
+                self.descarregar()
+            except Exception:
+                pass  # erros de envio ficam registrados na própria fila; tenta de novo no próximo ciclo
+
+    def descarregar(self):
+        """Envia os pendentes em ordem, um lote por vez; retorna quantas linhas foram confirmadas"""
+        enviadas = 0
+        while True:
+            pendentes = self._executar(
+                "SELECT id, tabela, linha, tentativas FROM fila "
+                "WHERE enviado_em IS NULL AND proxima_tentativa <= ? ORDER BY id LIMIT ?",
+                (time.time(), self.tamanho_lote),
+            )
+            if not pendentes:
+                break
+            # Só o trecho inicial da mesma tabela: mantém a ordem de registro entre tabelas
+            tabela = pendentes[0]["tabela"]
+            lote = []
+            for item in pendentes:
+                if item["tabela"] != tabela:
+                    break
+                lote.append(item)
+            ids = [item["id"] for item in lote]
+            marcadores = ",".join("?" * len(ids))
+            try:
+                self.repo.inserir_idempotente(tabela, [json.loads(item["linha"]) for item in lote])
+            except Exception as e:
+                espera = min(2 ** lote[0]["tentativas"], ESPERA_MAXIMA)
+                self._executar(
+                    f"UPDATE fila SET tentativas = tentativas + 1, erro = ?, proxima_tentativa = ? WHERE id IN ({marcadores})",
+                    (str(e), time.time() + espera, *ids),
+                )
+                break
+            # Vence os snapshots antes de tirar as linhas dos pendentes: quem lê os pendentes e
+            # depois o banco vê cada linha em pelo menos um dos dois (nunca em nenhum)
+            if self.ao_enviar:
+                self.ao_enviar(tabela)
+            self._executar(f"UPDATE fila SET enviado_em = ?, erro = NULL WHERE id IN ({marcadores})", (_agora(), *ids))
+            enviadas += len(lote)
+
+        limite = (datetime.now() - timedelta(days=MANTER_ENVIADOS_DIAS)).strftime("%Y-%m-%d %H:%M:%S")
+        self._executar("DELETE FROM fila WHERE enviado_em < ?", (limite,))
+        return enviadas
+
+    def desperdicio_pendente(self):
+        """{id_producao: quantidade} do desperdício ainda não enviado (o banco ainda não descontou)"""
+        linhas = self._executar(
+            "SELECT json_extract(linha, '$.id_producao') AS id_producao, "
+            "SUM(json_extract(linha, '$.quantidade_desperdicada')) AS quantidade "
+            "FROM fila WHERE enviado_em IS NULL AND tabela = 'desperdicio' GROUP BY 1"
+        )
+        return {int(l["id_producao"]): int(l["quantidade"]) for l in linhas if l["id_producao"] is not None}
+
+    def situacao(self):
+        """{"pendentes": n, "com_erro": n, "ultimo_erro": texto ou None}"""
+        linha = self._executar(
+            "SELECT COUNT(*) AS pendentes, COUNT(erro) AS com_erro, MAX(CASE WHEN erro IS NOT NULL THEN id END) AS ultimo "
+            "FROM fila WHERE enviado_em IS NULL"
+        )[0]
+        ultimo_erro = None
+        if linha["ultimo"] is not None:
+            ultimo_erro = self._executar("SELECT erro FROM fila WHERE id = ?", (linha["ultimo"],))[0]["erro"]
+        return {"pendentes": linha["pendentes"], "com_erro": linha["com_erro"], "ultimo_erro": ultimo_erro}
+
+    def recentes(self, tabela=None, limite=10):
+        """Últimos registros enfileirados com a situação de envio de cada um"""
+        where, parametros = ("WHERE tabela = ?", (tabela,)) if tabela else ("", ())
+        itens = self._executar(
+            f"SELECT tabela, linha, criado_em, enviado_em, tentativas, erro FROM fila {where} ORDER BY id DESC LIMIT ?",
+            (*parametros, limite),
+        )
+        return pd.DataFrame([
+            {
+                "situação": "✅ enviado" if item["enviado_em"] else ("⚠️ tentando de novo" if item["erro"] else "⏳ pendente"),
+                "tabela": item["tabela"],
+                **{c: v for c, v in json.loads(item["linha"]).items() if c != CHAVE_IDEMPOTENCIA},
+                "registrado_em": item["criado_em"],
+                "enviado_em": item["enviado_em"],
+                "tentativas": item["tentativas"],
+                "erro": item["erro"],
+            }
+            for item in itens
+        ])
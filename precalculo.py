@@ -0,0 +1,183 @@
+# ====================================
+# 🗓️ PRÉ-CÁLCULO EM LOTE (FORA DO STREAMLIT)
+# ====================================
+# Gera, para cada loja, arquivos prontos para download: lista de
+# vencimentos do dia, retrato do estoque e os relatórios padrão
+# (últimos 7 e 30 dias) em CSV, XLSX e Parquet, com um manifesto.json.
+# O app os oferece em "📦 Relatórios prontos"; as telas ao vivo
+# (alertas, Estoque, consulta de Relatórios) continuam no cache, porque
+# o retrato envelhece no primeiro registro do dia. Usa as mesmas funções
+# de dados/alertas/exportação do app; cada loja roda num processo separado.
+#
+# Uso (ex.: agendado no cron às 5h):
+#   python precalculo.py                                  # lojas do .streamlit/secrets.toml
+#   python precalculo.py --loja centro --processos 4 --saida /srv/artefatos
+#
+# Lojas: seções [lojas.<nome>] com as chaves de [armazenamento]
+# (backend, caminho, url, key, planilha...) e, opcionalmente, arquivo
+# (pasta do arquivamento). Sem [lojas], usa [armazenamento] como "principal".
+# ====================================
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tomllib
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import chain
+from pathlib import Path
+
+from alertas import IndiceValidade
+from arquivamento import ArquivoHistorico
+from dados import CacheTabelas, COLUNAS_RELATORIO, filtros_periodo, iterar_paginas
+from exportacao import exportar
+from repositorio import criar_repositorio
+
+PERIODOS = {"7_dias": 7, "30_dias": 30}
+CAMPOS_DATA = {"producao": "data_producao", "desperdicio": "data_desperdicio"}
+EXTENSOES = ("csv", "xlsx", "parquet")
+DIAS_VENCIMENTO = 2
+MANIFESTO = "manifesto.json"
+
+
+@contextmanager
+def _arquivo_atomico(destino):
+    # Quem está baixando o arquivo anterior nunca vê um arquivo pela metade
+    temporario = destino.with_name(destino.name + ".tmp")
+    try:
+        with open(temporario, "wb") as arquivo:
+            yield arquivo
+        os.replace(temporario, destino)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+
+def gerar_artefatos(repo, pasta, arquivo_historico=None, hoje=None, extensoes=EXTENSOES):
+    """Grava os artefatos de uma loja em `pasta` e retorna o manifesto"""
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    hoje = hoje or date.today()
+    artefatos = []
+
+    def registrar(nome, descricao, linhas, inicio):
+        artefatos.append({
+            "nome": nome, "descricao": descricao, "linhas": int(linhas),
+            "bytes": (pasta / nome).stat().st_size, "segundos": round(time.perf_counter() - inicio, 3),
+        })
+
+    # Snapshot único da execução: sem TTL, cada tabela é lida uma vez
+    cache = CacheTabelas(repo, ttl=float("inf"))
+
+    inicio = time.perf_counter()
+    vencimentos = cache.derivado("producao", IndiceValidade).entre(None, DIAS_VENCIMENTO, hoje)
+    with _arquivo_atomico(pasta / "vencimentos.parquet") as arquivo:
+        vencimentos.to_parquet(arquivo, compression="zstd", index=False)
+    registrar("vencimentos.parquet", f"Vencidos e vencendo em até {DIAS_VENCIMENTO} dias", len(vencimentos), inicio)
+
+    for tabela, descricao in (("estoque_lotes", "Lotes com estoque"), ("estoque_produtos", "Estoque por produto")):
+        inicio = time.perf_counter()
+        df = cache.obter(tabela)
+        with _arquivo_atomico(pasta / f"{tabela}.parquet") as arquivo:
+            df.to_parquet(arquivo, compression="zstd", index=False)
+        registrar(f"{tabela}.parquet", descricao, len(df), inicio)
+
+    for tabela, campo_data in CAMPOS_DATA.items():
+        colunas = COLUNAS_RELATORIO[tabela]
+        for rotulo, dias in PERIODOS.items():
+            ini = hoje - timedelta(days=dias)
+            # O período é lido uma vez (arquivo + banco) e gravado em todos os formatos
+            paginas = list(chain(
+                arquivo_historico.iterar_periodo(tabela, campo_data, ini, hoje, colunas) if arquivo_historico else [],
+                iterar_paginas(repo, tabela, colunas, filtros_periodo(campo_data, ini, hoje)),
+            ))
+            for extensao in extensoes:
+                inicio = time.perf_counter()
+                nome = f"{tabela}_{rotulo}.{extensao}"
+                with _arquivo_atomico(pasta / nome) as arquivo:
+                    linhas = exportar(iter(paginas), extensao, arquivo, colunas)
+                registrar(nome, f"{tabela.capitalize()} — últimos {dias} dias ({extensao})", linhas, inicio)
+
+    manifesto = {"gerado_em": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "data": hoje.isoformat(),
+                 "artefatos": artefatos}
+    # Manifesto por último: só aponta para arquivos já completos
+    with _arquivo_atomico(pasta / MANIFESTO) as arquivo:
+        arquivo.write(json.dumps(manifesto, ensure_ascii=False, indent=2).encode("utf-8"))
+    return manifesto
+
+
+def ler_manifesto(pasta):
+    """Manifesto dos artefatos da loja (None se o pré-cálculo ainda não rodou)"""
+    caminho = Path(pasta) / MANIFESTO
+    if not caminho.exists():
+        return None
+    return json.loads(caminho.read_text(encoding="utf-8"))
+
+
+def lojas_configuradas(segredos):
+    """{nome: config} das seções [lojas.*]; sem elas, a loja "principal" do próprio app"""
+    if "lojas" in segredos:
+        return dict(segredos["lojas"])
+    config = {**segredos.get("armazenamento", {}), **segredos.get("supabase", {})}
+    if config.get("backend") == "sheets":
+        config["credenciais"] = segredos["connections"]["gsheets"]
+    config.setdefault("arquivo", segredos.get("retencao", {}).get("pasta", "arquivo"))
+    return {"principal": config}
+
+
+def processar_loja(tarefa):
+    """Roda num processo próprio: retorna (loja, manifesto ou None, erro ou None, segundos)"""
+    nome, config, saida = tarefa
+    inicio = time.perf_counter()
+    try:
+        # O SQLite criaria um banco vazio no lugar de um caminho digitado errado
+        if config.get("backend") == "sqlite" and not Path(config.get("caminho", "controle_producao.db")).is_file():
+            raise FileNotFoundError(f"banco SQLite não encontrado: {config.get('caminho', 'controle_producao.db')}")
+        repo = criar_repositorio(config)
+        arquivo_historico = ArquivoHistorico(config["arquivo"]) if config.get("arquivo") else None
+        manifesto = gerar_artefatos(repo, Path(saida) / nome, arquivo_historico)
+        return nome, manifesto, None, time.perf_counter() - inicio
+    except Exception as e:
+        return nome, None, f"{type(e).__name__}: {e}", time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-calcula vencimentos, estoque e relatórios padrão de cada loja.")
+    parser.add_argument("--segredos", default=".streamlit/secrets.toml", help="arquivo TOML com a configuração")
+    parser.add_argument("--saida", help="pasta dos artefatos (padrão: [artefatos] pasta ou 'artefatos')")
+    parser.add_argument("--loja", action="append", help="processa só esta loja (pode repetir)")
+    parser.add_argument("--processos", type=int, help="processos em paralelo (padrão: um por loja, até o nº de CPUs)")
+    args = parser.parse_args()
+
+    with open(args.segredos, "rb") as f:
+        segredos = tomllib.load(f)
+    lojas = lojas_configuradas(segredos)
+    if args.loja:
+        desconhecidas = set(args.loja) - set(lojas)
+        if desconhecidas:
+            parser.error(f"loja(s) não configurada(s): {', '.join(sorted(desconhecidas))}")
+        lojas = {nome: lojas[nome] for nome in args.loja}
+    saida = args.saida or segredos.get("artefatos", {}).get("pasta", "artefatos")
+    tarefas = [(nome, config, saida) for nome, config in lojas.items()]
+
+    processos = args.processos or min(len(tarefas), os.cpu_count() or 1)
+    if processos > 1:
+        with multiprocessing.Pool(processos) as pool:
+            resultados = pool.map(processar_loja, tarefas)
+    else:
+        resultados = [processar_loja(tarefa) for tarefa in tarefas]
+
+    falhas = 0
+    for nome, manifesto, erro, segundos in resultados:
+        if erro:
+            falhas += 1
+            print(f"❌ {nome}: {erro}")
+        else:
+            print(f"✅ {nome}: {len(manifesto['artefatos'])} artefato(s) em {segundos:.1f} s")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# ====================================
+# 🧁 REGRAS DE REGISTRO DE PRODUÇÃO
+# ====================================
+# Cor do dia e validade aplicadas tanto ao registro individual quanto
+# ao registro em lote (grade ou arquivo no formato de producao.csv).
+# ====================================
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+VALIDADE_DIAS = 2
+CORES = ["azul", "verde", "amarelo", "laranja", "vermelho", "prata", "dourado"]
+
+
+def cor_do_dia(dia_semana):
+    return CORES[dia_semana]
+
+
+def montar_producao(produto, quantidade, data=None):
+    """Linha de producao com cor do dia e validade calculadas a partir da data"""
+    data = data or datetime.now()
+    return {
+        "data_producao": data.strftime("%Y-%m-%d %H:%M:%S"),
+        "produto": produto,
+        "cor": cor_do_dia(data.weekday()),
+        "quantidade_produzida": int(quantidade),
+        "data_validade": (data + timedelta(days=VALIDADE_DIAS)).strftime("%Y-%m-%d"),
+    }
+
+
+def validar_producao_em_lote(df, agora=None):
+    """Valida uma grade/planilha de produção (colunas como producao.csv)
+
+    Retorna (linhas, erros): as linhas prontas para inserir e uma lista de
+    (linha, mensagem) com a numeração da planilha (cabeçalho = linha 1).
+    Colunas extras (id, cor, data_validade, ...) são ignoradas: cor e
+    validade seguem as regras do dia de produção.
+    """
+    agora = agora or datetime.now()
+    if "produto" not in df.columns or "quantidade_produzida" not in df.columns:
+        return [], [(1, "Colunas obrigatórias: produto, quantidade_produzida")]
+
+    produto = df["produto"].astype("string").str.strip()
+    quantidade = pd.to_numeric(df["quantidade_produzida"], errors="coerce")
+    if "data_producao" in df.columns:
+        informada = df["data_producao"].notna() & (df["data_producao"].astype("string").str.strip() != "")
+        convertida = pd.to_datetime(df["data_producao"].where(informada), errors="coerce")
+        data_invalida = informada & convertida.isna()
+        data = convertida.fillna(pd.Timestamp(agora))
+    else:
+        data = pd.Series(pd.Timestamp(agora), index=df.index)
+        data_invalida = pd.Series(False, index=df.index)
+
+    # Linhas totalmente vazias (sobras da grade/planilha) são descartadas
+    vazia = produto.fillna("").eq("") & quantidade.isna()
+    problemas = [
+        (produto.fillna("").eq(""), "produto não informado"),
+        (quantidade.isna() | (quantidade < 1) | (quantidade % 1 != 0), "quantidade deve ser um inteiro maior que zero"),
+        (data_invalida, "data_producao inválida"),
+    ]
+
+    erros = []
+    invalida = pd.Series(False, index=df.index)
+    for mascara, mensagem in problemas:
+        mascara = mascara.fillna(True) & ~vazia
+        invalida |= mascara
+        erros.extend((int(pos) + 2, mensagem) for pos in mascara.to_numpy().nonzero()[0])
+    erros.sort()
+
+    ok = ~invalida & ~vazia
+    linhas = [
+        montar_producao(p, q, d.to_pydatetime())
+        for p, q, d in zip(produto[ok], quantidade[ok], data[ok])
+    ]
+    return linhas, erros
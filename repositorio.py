@@ -0,0 +1,544 @@
+# ====================================
+# 🗃️ REPOSITÓRIOS DE ARMAZENAMENTO
+# ====================================
+# Interface única para producao, desperdicio, usuarios e o livro de
+# estoque, com três implementações:
+# - RepositorioSupabase: produção (PostgREST)
+# - RepositorioSheets: planilha Google (modo diagnóstico / legado)
+# - RepositorioSQLite: arquivo local ou memória (testes e benchmark)
+# ====================================
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+PASTA_SQL_SQLITE = Path(__file__).parent / "sql" / "sqlite"
+
+OPERADORES_SQL = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+class Repositorio:
+    """Operações de leitura e escrita usadas pelo app
+
+    Filtros são tuplas (coluna, operador, valor), com operador em
+    eq, neq, gt, gte, lt, lte, in e not_null (valor ignorado).
+    """
+
+    def selecionar(self, tabela, colunas=None, filtros=(), ordem=None, limite=None):
+        """Linhas (lista de dicts) que atendem a todos os filtros"""
+        raise NotImplementedError
+
+    def contar(self, tabela, filtros=()):
+        """Quantidade de linhas que atendem aos filtros"""
+        raise NotImplementedError
+
+    def inserir(self, tabela, linhas):
+        """Insere a lista de linhas numa única operação; retorna as linhas com id"""
+        raise NotImplementedError
+
+    def inserir_idempotente(self, tabela, linhas, chave="chave_idempotencia"):
+        """Como inserir, mas ignora linhas cuja `chave` já existe (reenvios da fila de escrita)"""
+        raise NotImplementedError
+
+    def atualizar(self, tabela, valores, filtros):
+        raise NotImplementedError
+
+    def excluir(self, tabela, filtros):
+        raise NotImplementedError
+
+    def remarcar_lotes(self, itens, agora):
+        """Remarca [(id, quantidade, dias_extra), ...] atomicamente; retorna os lotes novos"""
+        raise NotImplementedError
+
+
+# ====================================
+# SUPABASE
+# ====================================
+class RepositorioSupabase(Repositorio):
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    @staticmethod
+    def _filtrar(consulta, filtros):
+        for coluna, operador, valor in filtros:
+            if operador == "in":
+                consulta = consulta.in_(coluna, list(valor))
+            elif operador == "not_null":
+                consulta = consulta.not_.is_(coluna, "null")
+            else:
+                consulta = getattr(consulta, operador)(coluna, valor)
+        return consulta
+
+    def selecionar(self, tabela, colunas=None, filtros=(), ordem=None, limite=None):
+        consulta = self._filtrar(self.cliente.table(tabela).select(",".join(colunas) if colunas else "*"), filtros)
+        if ordem:
+            consulta = consulta.order(ordem)
+        if limite is not None:
+            consulta = consulta.limit(limite)
+        return consulta.execute().data
+
+    def contar(self, tabela, filtros=()):
+        return self._filtrar(self.cliente.table(tabela).select("*", count="exact", head=True), filtros).execute().count
+
+    def inserir(self, tabela, linhas):
+        return self.cliente.table(tabela).insert(linhas).execute().data
+
+    def inserir_idempotente(self, tabela, linhas, chave="chave_idempotencia"):
+        # insert ... on conflict (chave) do nothing: índice único de sql/supabase/005_idempotencia.sql
+        return self.cliente.table(tabela).upsert(linhas, on_conflict=chave, ignore_duplicates=True).execute().data
+
+    def atualizar(self, tabela, valores, filtros):
+        self._filtrar(self.cliente.table(tabela).update(valores), filtros).execute()
+
+    def excluir(self, tabela, filtros):
+        self._filtrar(self.cliente.table(tabela).delete(), filtros).execute()
+
+    def remarcar_lotes(self, itens, agora):
+        # Função do banco: sql/supabase/002_remarcacao.sql
+        return self.cliente.rpc("remarcar_lotes", {
+            "itens": [
+                {"id": int(id_), "quantidade": int(quantidade), "dias_extra": int(dias_extra)}
+                for id_, quantidade, dias_extra in itens
+            ],
+            "agora": agora,
+        }).execute().data
+
+
+# ====================================
+# SQLITE (LOCAL)
+# ====================================
+class RepositorioSQLite(Repositorio):
+    """Banco local com o mesmo esquema (sql/sqlite/*.sql aplicados em ordem)"""
+
+    def __init__(self, caminho=":memory:"):
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self.conexao.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self.conexao:
+            # Cada arquivo roda uma única vez por banco (ALTER TABLE não tem IF NOT EXISTS)
+            self.conexao.execute("CREATE TABLE IF NOT EXISTS migracoes (arquivo TEXT PRIMARY KEY)")
+            aplicadas = {linha[0] for linha in self.conexao.execute("SELECT arquivo FROM migracoes")}
+            for arquivo in sorted(PASTA_SQL_SQLITE.glob("*.sql")):
+                if arquivo.name not in aplicadas:
+                    self.conexao.executescript(arquivo.read_text(encoding="utf-8"))
+                    self.conexao.execute("INSERT INTO migracoes (arquivo) VALUES (?)", (arquivo.name,))
+
+    @staticmethod
+    def _where(filtros):
+        condicoes, parametros = [], []
+        for coluna, operador, valor in filtros:
+            if operador == "in":
+                valor = list(valor)
+                condicoes.append(f'"{coluna}" IN ({",".join("?" * len(valor))})')
+                parametros.extend(valor)
+            elif operador == "not_null":
+                condicoes.append(f'"{coluna}" IS NOT NULL')
+            else:
+                condicoes.append(f'"{coluna}" {OPERADORES_SQL[operador]} ?')
+                parametros.append(valor)
+        return (" WHERE " + " AND ".join(condicoes) if condicoes else ""), parametros
+
+    def _executar(self, sql, parametros=()):
+        with self._lock, self.conexao:
+            return [dict(linha) for linha in self.conexao.execute(sql, parametros).fetchall()]
+
+    def selecionar(self, tabela, colunas=None, filtros=(), ordem=None, limite=None):
+        selecao = ", ".join(f'"{c}"' for c in colunas) if colunas else "*"
+        where, parametros = self._where(filtros)
+        sql = f'SELECT {selecao} FROM "{tabela}"{where}'
+        if ordem:
+            sql += f' ORDER BY "{ordem}"'
+        if limite is not None:
+            sql += f" LIMIT {int(limite)}"
+        return self._executar(sql, parametros)
+
+    def contar(self, tabela, filtros=()):
+        where, parametros = self._where(filtros)
+        return self._executar(f'SELECT COUNT(*) AS n FROM "{tabela}"{where}', parametros)[0]["n"]
+
+    def _inserir(self, tabela, linhas, conflito=""):
+        if not linhas:
+            return []
+        colunas = list(dict.fromkeys(c for linha in linhas for c in linha))
+        nomes = ", ".join(f'"{c}"' for c in colunas)
+        sql = f'INSERT INTO "{tabela}" ({nomes}) VALUES ({", ".join("?" * len(colunas))}){conflito}'
+        with self._lock, self.conexao:
+            ultimo = self.conexao.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{tabela}"').fetchone()[0]
+            self.conexao.executemany(sql, ([linha.get(c) for c in colunas] for linha in linhas))
+            novas = self.conexao.execute(f'SELECT * FROM "{tabela}" WHERE id > ? ORDER BY id', (ultimo,))
+            return [dict(linha) for linha in novas.fetchall()]
+
+    def inserir(self, tabela, linhas):
+        return self._inserir(tabela, linhas)
+
+    def inserir_idempotente(self, tabela, linhas, chave="chave_idempotencia"):
+        return self._inserir(tabela, linhas, f' ON CONFLICT ("{chave}") DO NOTHING')
+
+    def atualizar(self, tabela, valores, filtros):
+        where, parametros = self._where(filtros)
+        atribuicoes = ", ".join(f'"{c}" = ?' for c in valores)
+        self._executar(f'UPDATE "{tabela}" SET {atribuicoes}{where}', [*valores.values(), *parametros])
+
+    def excluir(self, tabela, filtros):
+        where, parametros = self._where(filtros)
+        self._executar(f'DELETE FROM "{tabela}"{where}', parametros)
+
+    def remarcar_lotes(self, itens, agora):
+        # Mesma regra da função remarcar_lotes do Supabase, numa transação do SQLite
+        data = datetime.strptime(agora, "%Y-%m-%d %H:%M:%S")
+        novos = []
+        with self._lock, self.conexao:
+            for id_, quantidade, dias_extra in itens:
+                lote = self.conexao.execute(
+                    "SELECT p.*, COALESCE(e.estoque_atual, p.quantidade_produzida) AS disponivel "
+                    "FROM producao p LEFT JOIN estoque_lotes e ON e.id_producao = p.id WHERE p.id = ?",
+                    (int(id_),),
+                ).fetchone()
+                if lote is None:
+                    raise ValueError(f"Lote {id_} não encontrado.")
+                if not 1 <= int(quantidade) <= lote["disponivel"]:
+                    raise ValueError(f"Quantidade inválida para o lote {id_} (disponível: {lote['disponivel']}).")
+                if int(dias_extra) < 1:
+                    raise ValueError(f"Dias adicionais inválidos para o lote {id_}.")
+                self.conexao.execute(
+                    "UPDATE producao SET quantidade_produzida = quantidade_produzida - ?, data_remarcacao = ? WHERE id = ?",
+                    (int(quantidade), agora, int(id_)),
+                )
+                cursor = self.conexao.execute(
+                    "INSERT INTO producao (data_producao, produto, quantidade_produzida, cor, data_validade) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (agora, lote["produto"], int(quantidade), lote["cor"],
+                     (data + timedelta(days=int(dias_extra))).strftime("%Y-%m-%d")),
+                )
+                novos.append(dict(self.conexao.execute(
+                    "SELECT * FROM producao WHERE id = ?", (cursor.lastrowid,)).fetchone()))
+        return novos
+
+
+# ====================================
+# GOOGLE SHEETS
+# ====================================
+def conectar_planilha(credenciais, chave):
+    """Abre a planilha com uma conta de serviço (dependências: gspread, google-auth)"""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    escopo = [
+        "https://spreadsheets.google.com/feeds",
+        "https://www.googleapis.com/auth/drive"
+    ]
+    creds = Credentials.from_service_account_info(credenciais, scopes=escopo)
+    return gspread.authorize(creds).open_by_key(chave)
+
+
+def criar_repositorio(config):
+    """Repositório a partir de um dict no formato de [armazenamento] do secrets.toml
+
+    Chaves: backend ("supabase" | "sqlite" | "sheets"); url e key (Supabase);
+    caminho (SQLite); planilha e credenciais (Sheets).
+    """
+    backend = config.get("backend", "supabase")
+    if backend == "sqlite":
+        return RepositorioSQLite(config.get("caminho", "controle_producao.db"))
+    if backend == "sheets":
+        return RepositorioSheets(conectar_planilha(config["credenciais"], config["planilha"]))
+    from supabase import create_client
+
+    return RepositorioSupabase(create_client(config["url"], config["key"]))
+
+
+def filtrar_df(df, filtros):
+    """Aplica filtros (coluna, operador, valor) a um DataFrame"""
+    mascara = pd.Series(True, index=df.index)
+    for coluna, operador, valor in filtros:
+        serie = df[coluna]
+        if operador == "in":
+            mascara &= serie.isin(list(valor))
+        elif operador == "not_null":
+            mascara &= serie.notna() & (serie != "")
+        else:
+            mascara &= getattr(serie, {"neq": "ne", "gte": "ge", "lte": "le"}.get(operador, operador))(valor)
+    return df[mascara]
+
+
+def _valor_celula(valor):
+    # Mesma conversão do get_all_records: vazio vira nulo e números em texto viram int/float
+    if not isinstance(valor, str):
+        return valor
+    if valor == "":
+        return None
+    for tipo in (int, float):
+        try:
+            return tipo(valor)
+        except ValueError:
+            pass
+    return valor
+
+
+def _texto_celula(valor):
+    """Forma textual usada para comparar células (5, 5.0 e "5" são iguais; nulo é "")"""
+    if valor is None or valor != valor:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _coluna_a1(numero):
+    letras = ""
+    while numero:
+        numero, resto = divmod(numero - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _faixas_contiguas(posicoes):
+    """[7, 3, 4, 8] -> [(7, 8), (3, 4)]: faixas de posições consecutivas, de baixo para cima"""
+    faixas = []
+    for pos in sorted(posicoes, reverse=True):
+        if faixas and faixas[-1][0] == pos + 1:
+            faixas[-1][0] = pos
+        else:
+            faixas.append([pos, pos])
+    return [tuple(f) for f in faixas]
+
+
+def _reaplicar_alteracoes(antigo, novo, atual):
+    """Refaz sobre a aba atual só o que `novo` mudou em relação a `antigo` (pelo id)
+
+    Linhas que outra escrita removeu ou alterou depois da leitura ficam como estão
+    na aba, a não ser que `novo` também as tenha alterado. Sem id único ou com
+    colunas diferentes, retorna `novo` como veio.
+    """
+    colunas = novo.columns.tolist()
+    if ("id" not in colunas or antigo.columns.tolist() != colunas or atual.columns.tolist() != colunas
+            or antigo["id"].duplicated().any() or novo["id"].duplicated().any() or atual["id"].duplicated().any()):
+        return novo
+    texto_antigo = antigo.map(_texto_celula).set_index("id", drop=False)
+    texto_novo = novo.map(_texto_celula).reset_index(drop=True)
+    ids_atual = atual["id"].map(_texto_celula).reset_index(drop=True)
+
+    existia = texto_novo["id"].isin(texto_antigo.index)
+    mudou = ~existia
+    comparadas = texto_novo[existia]
+    mudou[existia] = (comparadas.to_numpy() != texto_antigo.loc[comparadas["id"]].to_numpy()).any(axis=1)
+    removidos = texto_antigo.index[~texto_antigo.index.isin(texto_novo["id"])]
+
+    resultado = atual.astype(object).reset_index(drop=True)
+    posicoes = pd.Series(range(len(resultado)), index=ids_atual)
+    # Alteradas que ainda estão na aba: no lugar; removidas por outra escrita: não voltam
+    alteradas = mudou & existia & texto_novo["id"].isin(ids_atual)
+    resultado.iloc[posicoes[texto_novo["id"][alteradas]].to_numpy()] = novo.astype(object)[alteradas.to_numpy()].to_numpy()
+    resultado = resultado[~ids_atual.isin(removidos)]
+    return pd.concat([resultado, novo[(~existia).to_numpy()]], ignore_index=True)
+
+
+class RepositorioSheets(Repositorio):
+    """Uma aba por tabela; como a API não tem consultas, os filtros rodam em memória
+
+    O livro de estoque e os resumos diários são calculados a partir das abas
+    producao e desperdicio. As escritas comparam com o último snapshot lido da aba e enviam só as
+    linhas novas (append_rows), alteradas (batch_update) e removidas.
+    """
+
+    CALCULADAS = ("estoque_lotes", "estoque_produtos", "resumo_diario", "resumo_motivos")
+
+    def __init__(self, planilha):
+        self.planilha = planilha
+        self._snapshots = {}  # aba -> DataFrame como foi lido (posição i = linha i + 2 da aba)
+        self._lock = threading.Lock()
+        self._locks_aba = {}
+
+    def _lock_da_aba(self, tabela):
+        # Reentrante: atualizar/excluir/remarcar seguram a aba da leitura até o salvar
+        with self._lock:
+            return self._locks_aba.setdefault(tabela, threading.RLock())
+
+    def ler_abas(self, *tabelas):
+        """Lê várias abas numa única chamada (batch_get) e guarda o snapshot de cada uma"""
+        resposta = self.planilha.values_batch_get([f"'{t}'" for t in tabelas])
+        dfs = []
+        for tabela, intervalo in zip(tabelas, resposta.get("valueRanges", [])):
+            valores = intervalo.get("values", [])
+            cabecalho = valores[0] if valores else []
+            # A API corta as células vazias no fim de cada linha
+            linhas = [
+                [_valor_celula(v) for v in linha[:len(cabecalho)]] + [None] * (len(cabecalho) - len(linha))
+                for linha in valores[1:]
+            ]
+            df = pd.DataFrame(linhas, columns=cabecalho)
+            with self._lock:
+                self._snapshots[tabela] = df
+            dfs.append(df.copy())
+        return dfs
+
+    def _ler(self, tabela):
+        if tabela in ("estoque_lotes", "estoque_produtos"):
+            from estoque import calcular_estoque_lotes, calcular_estoque_produtos
+
+            lotes = calcular_estoque_lotes(*self.ler_abas("producao", "desperdicio"))
+            return lotes if tabela == "estoque_lotes" else calcular_estoque_produtos(lotes)
+        if tabela in ("resumo_diario", "resumo_motivos"):
+            from analises import calcular_resumos
+
+            diario, motivos = calcular_resumos(*self.ler_abas("producao", "desperdicio"))
+            return diario if tabela == "resumo_diario" else motivos
+        return self.ler_abas(tabela)[0]
+
+    def salvar(self, tabela, df):
+        """Grava o DataFrame na aba enviando só a diferença para o último snapshot lido
+
+        Retorna {"novas": n, "alteradas": n, "removidas": n}. As linhas são
+        identificadas pelo "id"; sem id único ou com cabeçalho diferente, a aba
+        é sobrescrita a partir de A1 (sem limpar antes).
+        """
+        with self._lock_da_aba(tabela):
+            ws = self.planilha.worksheet(tabela)
+            with self._lock:
+                antigo = self._snapshots.pop(tabela, None)
+            # As posições vêm do snapshot: se as linhas mudaram desde a leitura (outra instância,
+            # alguém editando a planilha), a coluna id não bate e as alterações são refeitas sobre a aba atual
+            if antigo is not None and "id" in antigo.columns:
+                ids_aba = ws.col_values(antigo.columns.get_loc("id") + 1)[1:]
+                ids_aba += [""] * (len(antigo) - len(ids_aba))  # a API corta as vazias no fim
+                if [_texto_celula(_valor_celula(v)) for v in ids_aba] != antigo["id"].map(_texto_celula).tolist():
+                    atual = self._ler_sem_snapshot(tabela)
+                    antigo, df = atual, _reaplicar_alteracoes(antigo, df, atual)
+            if antigo is None:
+                antigo = self._ler_sem_snapshot(tabela)
+            return self._gravar_diferenca(ws, antigo, df)
+
+    def _ler_sem_snapshot(self, tabela):
+        df = self.ler_abas(tabela)[0]
+        with self._lock:
+            self._snapshots.pop(tabela, None)
+        return df
+
+    def _gravar_diferenca(self, ws, antigo, df):
+        cabecalho = df.columns.tolist()
+        valores = df.astype(object).where(df.notna(), "").values.tolist()
+        if (antigo.columns.tolist() != cabecalho or "id" not in cabecalho
+                or antigo["id"].duplicated().any() or df["id"].duplicated().any()):
+            return self._sobrescrever(ws, cabecalho, valores, antigo)
+
+        texto_antigo = antigo.map(_texto_celula).set_index("id", drop=False)
+        texto_novo = df.map(_texto_celula).reset_index(drop=True)
+        posicoes = pd.Series(range(len(antigo)), index=texto_antigo.index)
+
+        existe = texto_novo["id"].isin(posicoes.index).to_numpy()
+        comparadas = texto_novo[existe]
+        mudou = (comparadas.to_numpy() != texto_antigo.loc[comparadas["id"]].to_numpy()).any(axis=1)
+        ultima_coluna = _coluna_a1(len(cabecalho))
+        alteradas = [
+            {"range": f"A{linha}:{ultima_coluna}{linha}", "values": [valores[i]]}
+            for i, linha in zip(comparadas.index[mudou], posicoes[comparadas["id"][mudou]] + 2)
+        ]
+        novas = [valores[i] for i in texto_novo.index[~existe]]
+        removidas = posicoes[~posicoes.index.isin(texto_novo["id"])].tolist()
+
+        # Ordem segura: altera no lugar, acrescenta no fim e só então remove (de baixo para cima)
+        if alteradas:
+            ws.batch_update(alteradas)
+        if novas:
+            ws.append_rows(novas, value_input_option="USER_ENTERED")
+        for ini, fim in _faixas_contiguas(removidas):
+            ws.delete_rows(ini + 2, fim + 2)
+        return {"novas": len(novas), "alteradas": len(alteradas), "removidas": len(removidas)}
+
+    @staticmethod
+    def _sobrescrever(ws, cabecalho, valores, antigo):
+        ws.update([cabecalho] + valores)
+        if len(antigo) > len(valores):
+            ws.delete_rows(len(valores) + 2, len(antigo) + 1)
+        if len(antigo.columns) > len(cabecalho):
+            ws.batch_clear([f"{_coluna_a1(len(cabecalho) + 1)}:{_coluna_a1(len(antigo.columns))}"])
+        return {"novas": len(valores), "alteradas": 0, "removidas": max(len(antigo) - len(valores), 0)}
+
+    def selecionar(self, tabela, colunas=None, filtros=(), ordem=None, limite=None):
+        df = self._ler(tabela)
+        if df.empty:
+            return []
+        df = filtrar_df(df, filtros)
+        if ordem:
+            df = df.sort_values(ordem)
+        if limite is not None:
+            df = df.head(limite)
+        if colunas:
+            df = df.reindex(columns=colunas)
+        return df.astype(object).where(df.notna(), None).to_dict("records")
+
+    def contar(self, tabela, filtros=()):
+        df = self._ler(tabela)
+        return len(filtrar_df(df, filtros)) if filtros and not df.empty else len(df)
+
+    def inserir(self, tabela, linhas):
+        ws = self.planilha.worksheet(tabela)
+        cabecalho = ws.row_values(1)
+        ids = [int(v) for v in ws.col_values(cabecalho.index("id") + 1)[1:] if str(v).strip()]
+        proximo = max(ids, default=0) + 1
+        novas = [{**linha, "id": proximo + i} for i, linha in enumerate(linhas)]
+        ws.append_rows(
+            [["" if linha.get(c) is None else linha.get(c) for c in cabecalho] for linha in novas],
+            value_input_option="USER_ENTERED",
+        )
+        return novas
+
+    def inserir_idempotente(self, tabela, linhas, chave="chave_idempotencia"):
+        ws = self.planilha.worksheet(tabela)
+        cabecalho = ws.row_values(1)
+        # Sem a coluna na aba não há como reconhecer reenvios: insere como veio
+        if chave in cabecalho:
+            existentes = set(ws.col_values(cabecalho.index(chave) + 1)[1:])
+            linhas = [linha for linha in linhas if linha.get(chave) not in existentes]
+        return self.inserir(tabela, linhas) if linhas else []
+
+    def atualizar(self, tabela, valores, filtros):
+        with self._lock_da_aba(tabela):
+            df = self._ler(tabela)
+            df.loc[filtrar_df(df, filtros).index, list(valores)] = list(valores.values())
+            self.salvar(tabela, df)
+
+    def excluir(self, tabela, filtros):
+        if tabela in self.CALCULADAS:
+            return  # não têm aba própria: acompanham producao/desperdicio
+        with self._lock_da_aba(tabela):
+            df = self._ler(tabela)
+            self.salvar(tabela, df.drop(index=filtrar_df(df, filtros).index))
+
+    def remarcar_lotes(self, itens, agora):
+        # Sem transação na API do Sheets: valida tudo antes e grava a diferença de uma vez.
+        # O disponível é o saldo do lote (produzido - desperdiçado), como no Supabase e no SQLite
+        from estoque import calcular_estoque_lotes
+
+        with self._lock_da_aba("producao"):
+            df, desperdicio = self.ler_abas("producao", "desperdicio")
+            saldos = calcular_estoque_lotes(df, desperdicio).set_index("id_producao")["estoque_atual"].to_dict()
+            data = datetime.strptime(agora, "%Y-%m-%d %H:%M:%S")
+            novos = []
+            proximo = int(df["id"].max()) + 1
+            for id_, quantidade, dias_extra in itens:
+                lote = df[df["id"] == int(id_)]
+                if lote.empty:
+                    raise ValueError(f"Lote {id_} não encontrado.")
+                disponivel = int(saldos[int(id_)])
+                if not 1 <= int(quantidade) <= disponivel:
+                    raise ValueError(f"Quantidade inválida para o lote {id_} (disponível: {disponivel}).")
+                if int(dias_extra) < 1:
+                    raise ValueError(f"Dias adicionais inválidos para o lote {id_}.")
+                # O mesmo lote repetido nos itens vê o saldo já reduzido
+                saldos[int(id_)] = disponivel - int(quantidade)
+                produzida = int(df.loc[lote.index[0], "quantidade_produzida"])
+                df.loc[lote.index, ["quantidade_produzida", "data_remarcacao"]] = [produzida - int(quantidade), agora]
+                novo = {
+                    "id": proximo, "data_producao": agora, "produto": lote.iloc[0]["produto"],
+                    "cor": lote.iloc[0]["cor"], "quantidade_produzida": int(quantidade),
+                    "data_validade": (data + timedelta(days=int(dias_extra))).strftime("%Y-%m-%d"),
+                }
+                df = pd.concat([df, pd.DataFrame([novo])], ignore_index=True)
+                novos.append(novo)
+                proximo += 1
+            self.salvar("producao", df)
+            return novos
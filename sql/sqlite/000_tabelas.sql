@@ -0,0 +1,38 @@
+-- ====================================
+-- 🗃️ TABELAS BASE (SQLite, execução local)
+-- ====================================
+-- Mesmas colunas das tabelas do Supabase; datas em texto
+-- ("YYYY-MM-DD HH:MM:SS" / "YYYY-MM-DD"), como o app grava.
+-- ====================================
+
+CREATE TABLE IF NOT EXISTS producao (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data_producao TEXT,
+    produto TEXT,
+    cor TEXT,
+    quantidade_produzida INTEGER,
+    data_remarcacao TEXT,
+    data_validade TEXT
+);
+CREATE INDEX IF NOT EXISTS producao_data_producao ON producao (data_producao);
+CREATE INDEX IF NOT EXISTS producao_data_remarcacao ON producao (data_remarcacao);
+
+CREATE TABLE IF NOT EXISTS desperdicio (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data_desperdicio TEXT,
+    produto TEXT,
+    cor TEXT,
+    quantidade_desperdicada INTEGER,
+    motivo TEXT,
+    id_producao INTEGER
+);
+CREATE INDEX IF NOT EXISTS desperdicio_data_desperdicio ON desperdicio (data_desperdicio);
+CREATE INDEX IF NOT EXISTS desperdicio_id_producao ON desperdicio (id_producao);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT,
+    usuario TEXT NOT NULL,
+    senha TEXT NOT NULL,
+    tipo TEXT DEFAULT 'usuario'
+);
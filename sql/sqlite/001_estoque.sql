@@ -0,0 +1,103 @@
+-- ====================================
+-- 📦 LIVRO DE ESTOQUE (SQLite, execução local)
+-- ====================================
+-- Equivalente ao sql/supabase/001_estoque.sql: saldos por lote e por
+-- produto mantidos por triggers em producao/desperdicio.
+-- ====================================
+
+CREATE TABLE IF NOT EXISTS estoque_lotes (
+    id_producao INTEGER PRIMARY KEY,
+    produto TEXT NOT NULL,
+    cor TEXT,
+    data_validade TEXT,
+    quantidade_produzida INTEGER NOT NULL DEFAULT 0,
+    quantidade_desperdicada INTEGER NOT NULL DEFAULT 0,
+    estoque_atual INTEGER GENERATED ALWAYS AS (quantidade_produzida - quantidade_desperdicada) STORED
+);
+CREATE INDEX IF NOT EXISTS estoque_lotes_produto_validade ON estoque_lotes (produto, data_validade);
+
+CREATE TABLE IF NOT EXISTS estoque_produtos (
+    produto TEXT PRIMARY KEY,
+    quantidade_produzida INTEGER NOT NULL DEFAULT 0,
+    quantidade_desperdicada INTEGER NOT NULL DEFAULT 0,
+    estoque_atual INTEGER GENERATED ALWAYS AS (quantidade_produzida - quantidade_desperdicada) STORED
+);
+
+-- producao: UPDATE = sai o lote antigo, entra o novo (mantendo o desperdício já lançado)
+CREATE TRIGGER IF NOT EXISTS estoque_producao_insert AFTER INSERT ON producao
+BEGIN
+    INSERT INTO estoque_lotes (id_producao, produto, cor, data_validade, quantidade_produzida)
+    VALUES (NEW.id, NEW.produto, NEW.cor, date(NEW.data_validade), COALESCE(NEW.quantidade_produzida, 0));
+    INSERT INTO estoque_produtos (produto, quantidade_produzida) VALUES (NEW.produto, COALESCE(NEW.quantidade_produzida, 0))
+    ON CONFLICT (produto) DO UPDATE SET quantidade_produzida = quantidade_produzida + excluded.quantidade_produzida;
+END;
+
+CREATE TRIGGER IF NOT EXISTS estoque_producao_update AFTER UPDATE ON producao
+BEGIN
+    INSERT INTO estoque_produtos (produto, quantidade_produzida, quantidade_desperdicada)
+    SELECT OLD.produto, -COALESCE(OLD.quantidade_produzida, 0), -quantidade_desperdicada
+    FROM estoque_lotes WHERE id_producao = OLD.id
+    ON CONFLICT (produto) DO UPDATE SET
+        quantidade_produzida = quantidade_produzida + excluded.quantidade_produzida,
+        quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+    INSERT INTO estoque_produtos (produto, quantidade_produzida, quantidade_desperdicada)
+    SELECT NEW.produto, COALESCE(NEW.quantidade_produzida, 0), quantidade_desperdicada
+    FROM estoque_lotes WHERE id_producao = OLD.id
+    ON CONFLICT (produto) DO UPDATE SET
+        quantidade_produzida = quantidade_produzida + excluded.quantidade_produzida,
+        quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+    UPDATE estoque_lotes SET
+        id_producao = NEW.id, produto = NEW.produto, cor = NEW.cor, data_validade = date(NEW.data_validade),
+        quantidade_produzida = COALESCE(NEW.quantidade_produzida, 0)
+    WHERE id_producao = OLD.id;
+    DELETE FROM estoque_produtos WHERE quantidade_produzida = 0 AND quantidade_desperdicada = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS estoque_producao_delete AFTER DELETE ON producao
+BEGIN
+    UPDATE estoque_produtos SET
+        quantidade_produzida = quantidade_produzida - COALESCE(OLD.quantidade_produzida, 0),
+        quantidade_desperdicada = quantidade_desperdicada
+            - COALESCE((SELECT quantidade_desperdicada FROM estoque_lotes WHERE id_producao = OLD.id), 0)
+    WHERE produto = OLD.produto;
+    DELETE FROM estoque_lotes WHERE id_producao = OLD.id;
+    DELETE FROM estoque_produtos WHERE quantidade_produzida = 0 AND quantidade_desperdicada = 0;
+END;
+
+-- desperdicio: o produto do lote manda; sem lote, conta no produto informado
+CREATE TRIGGER IF NOT EXISTS estoque_desperdicio_insert AFTER INSERT ON desperdicio
+BEGIN
+    INSERT INTO estoque_produtos (produto, quantidade_desperdicada)
+    VALUES (
+        COALESCE((SELECT produto FROM estoque_lotes WHERE id_producao = NEW.id_producao), NEW.produto),
+        COALESCE(NEW.quantidade_desperdicada, 0)
+    )
+    ON CONFLICT (produto) DO UPDATE SET quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+    UPDATE estoque_lotes SET quantidade_desperdicada = quantidade_desperdicada + COALESCE(NEW.quantidade_desperdicada, 0)
+    WHERE id_producao = NEW.id_producao;
+END;
+
+CREATE TRIGGER IF NOT EXISTS estoque_desperdicio_delete AFTER DELETE ON desperdicio
+BEGIN
+    UPDATE estoque_produtos SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE produto = (SELECT produto FROM estoque_lotes WHERE id_producao = OLD.id_producao);
+    UPDATE estoque_lotes SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE id_producao = OLD.id_producao;
+    DELETE FROM estoque_produtos WHERE quantidade_produzida = 0 AND quantidade_desperdicada = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS estoque_desperdicio_update AFTER UPDATE ON desperdicio
+BEGIN
+    UPDATE estoque_produtos SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE produto = (SELECT produto FROM estoque_lotes WHERE id_producao = OLD.id_producao);
+    UPDATE estoque_lotes SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE id_producao = OLD.id_producao;
+    INSERT INTO estoque_produtos (produto, quantidade_desperdicada)
+    VALUES (
+        COALESCE((SELECT produto FROM estoque_lotes WHERE id_producao = NEW.id_producao), NEW.produto),
+        COALESCE(NEW.quantidade_desperdicada, 0)
+    )
+    ON CONFLICT (produto) DO UPDATE SET quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+    UPDATE estoque_lotes SET quantidade_desperdicada = quantidade_desperdicada + COALESCE(NEW.quantidade_desperdicada, 0)
+    WHERE id_producao = NEW.id_producao;
+END;
@@ -0,0 +1,6 @@
+-- ====================================
+-- 🔐 LOGIN POR ÍNDICE (SQLite, execução local)
+-- ====================================
+
+UPDATE usuarios SET usuario = lower(trim(usuario)) WHERE usuario <> lower(trim(usuario));
+CREATE UNIQUE INDEX IF NOT EXISTS usuarios_usuario ON usuarios (usuario);
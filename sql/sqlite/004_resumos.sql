@@ -0,0 +1,91 @@
+-- ====================================
+-- 📉 RESUMOS DIÁRIOS (SQLite, execução local)
+-- ====================================
+-- Equivalente ao sql/supabase/004_resumos.sql: totais por dia mantidos
+-- por triggers de insert/update. Exclusões não descontam dos resumos.
+-- ====================================
+
+CREATE TABLE IF NOT EXISTS resumo_diario (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL,
+    produto TEXT NOT NULL,
+    cor TEXT NOT NULL DEFAULT '',
+    quantidade_produzida INTEGER NOT NULL DEFAULT 0,
+    quantidade_desperdicada INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (data, produto, cor)
+);
+
+CREATE TABLE IF NOT EXISTS resumo_motivos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL,
+    produto TEXT NOT NULL,
+    motivo TEXT NOT NULL DEFAULT '',
+    quantidade_desperdicada INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (data, produto, motivo)
+);
+
+CREATE TRIGGER IF NOT EXISTS resumo_producao_insert AFTER INSERT ON producao
+WHEN NEW.data_producao IS NOT NULL
+BEGIN
+    INSERT INTO resumo_diario (data, produto, cor, quantidade_produzida)
+    VALUES (date(NEW.data_producao), COALESCE(NEW.produto, ''), COALESCE(NEW.cor, ''), COALESCE(NEW.quantidade_produzida, 0))
+    ON CONFLICT (data, produto, cor) DO UPDATE SET quantidade_produzida = quantidade_produzida + excluded.quantidade_produzida;
+END;
+
+-- UPDATE (ex.: remarcação) = sai a linha antiga, entra a nova
+CREATE TRIGGER IF NOT EXISTS resumo_producao_update AFTER UPDATE ON producao
+BEGIN
+    UPDATE resumo_diario SET quantidade_produzida = quantidade_produzida - COALESCE(OLD.quantidade_produzida, 0)
+    WHERE data = date(OLD.data_producao) AND produto = COALESCE(OLD.produto, '') AND cor = COALESCE(OLD.cor, '');
+    INSERT INTO resumo_diario (data, produto, cor, quantidade_produzida)
+    SELECT date(NEW.data_producao), COALESCE(NEW.produto, ''), COALESCE(NEW.cor, ''), COALESCE(NEW.quantidade_produzida, 0)
+    WHERE NEW.data_producao IS NOT NULL
+    ON CONFLICT (data, produto, cor) DO UPDATE SET quantidade_produzida = quantidade_produzida + excluded.quantidade_produzida;
+END;
+
+CREATE TRIGGER IF NOT EXISTS resumo_desperdicio_insert AFTER INSERT ON desperdicio
+WHEN NEW.data_desperdicio IS NOT NULL
+BEGIN
+    INSERT INTO resumo_diario (data, produto, cor, quantidade_desperdicada)
+    VALUES (date(NEW.data_desperdicio), COALESCE(NEW.produto, ''), COALESCE(NEW.cor, ''), COALESCE(NEW.quantidade_desperdicada, 0))
+    ON CONFLICT (data, produto, cor) DO UPDATE SET quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+    INSERT INTO resumo_motivos (data, produto, motivo, quantidade_desperdicada)
+    VALUES (date(NEW.data_desperdicio), COALESCE(NEW.produto, ''), COALESCE(NEW.motivo, ''), COALESCE(NEW.quantidade_desperdicada, 0))
+    ON CONFLICT (data, produto, motivo) DO UPDATE SET quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+END;
+
+CREATE TRIGGER IF NOT EXISTS resumo_desperdicio_update AFTER UPDATE ON desperdicio
+BEGIN
+    UPDATE resumo_diario SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE data = date(OLD.data_desperdicio) AND produto = COALESCE(OLD.produto, '') AND cor = COALESCE(OLD.cor, '');
+    UPDATE resumo_motivos SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE data = date(OLD.data_desperdicio) AND produto = COALESCE(OLD.produto, '') AND motivo = COALESCE(OLD.motivo, '');
+    INSERT INTO resumo_diario (data, produto, cor, quantidade_desperdicada)
+    SELECT date(NEW.data_desperdicio), COALESCE(NEW.produto, ''), COALESCE(NEW.cor, ''), COALESCE(NEW.quantidade_desperdicada, 0)
+    WHERE NEW.data_desperdicio IS NOT NULL
+    ON CONFLICT (data, produto, cor) DO UPDATE SET quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+    INSERT INTO resumo_motivos (data, produto, motivo, quantidade_desperdicada)
+    SELECT date(NEW.data_desperdicio), COALESCE(NEW.produto, ''), COALESCE(NEW.motivo, ''), COALESCE(NEW.quantidade_desperdicada, 0)
+    WHERE NEW.data_desperdicio IS NOT NULL
+    ON CONFLICT (data, produto, motivo) DO UPDATE SET quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+END;
+
+-- Carga inicial de bancos já existentes (só com os resumos vazios, para não duplicar)
+INSERT INTO resumo_diario (data, produto, cor, quantidade_produzida, quantidade_desperdicada)
+SELECT data, produto, cor, SUM(produzida), SUM(desperdicada)
+FROM (
+    SELECT date(data_producao) AS data, COALESCE(produto, '') AS produto, COALESCE(cor, '') AS cor,
+           COALESCE(quantidade_produzida, 0) AS produzida, 0 AS desperdicada
+    FROM producao WHERE data_producao IS NOT NULL
+    UNION ALL
+    SELECT date(data_desperdicio), COALESCE(produto, ''), COALESCE(cor, ''), 0, COALESCE(quantidade_desperdicada, 0)
+    FROM desperdicio WHERE data_desperdicio IS NOT NULL
+)
+WHERE NOT EXISTS (SELECT 1 FROM resumo_diario)
+GROUP BY data, produto, cor;
+
+INSERT INTO resumo_motivos (data, produto, motivo, quantidade_desperdicada)
+SELECT date(data_desperdicio), COALESCE(produto, ''), COALESCE(motivo, ''), SUM(COALESCE(quantidade_desperdicada, 0))
+FROM desperdicio
+WHERE data_desperdicio IS NOT NULL AND NOT EXISTS (SELECT 1 FROM resumo_motivos)
+GROUP BY 1, 2, 3;
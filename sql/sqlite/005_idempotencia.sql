@@ -0,0 +1,11 @@
+-- ====================================
+-- 📤 CHAVE DE IDEMPOTÊNCIA (SQLite, execução local)
+-- ====================================
+-- Equivalente ao sql/supabase/005_idempotencia.sql.
+-- ====================================
+
+ALTER TABLE producao ADD COLUMN chave_idempotencia TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS producao_chave_idempotencia ON producao (chave_idempotencia);
+
+ALTER TABLE desperdicio ADD COLUMN chave_idempotencia TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS desperdicio_chave_idempotencia ON desperdicio (chave_idempotencia);
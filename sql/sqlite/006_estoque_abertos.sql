@@ -0,0 +1,7 @@
+-- ====================================
+-- 📦 LOTES ABERTOS (SQLite, execução local)
+-- ====================================
+-- Equivalente ao sql/supabase/006_estoque_abertos.sql.
+-- ====================================
+
+CREATE INDEX IF NOT EXISTS estoque_lotes_abertos ON estoque_lotes (id_producao) WHERE estoque_atual > 0;
@@ -0,0 +1,66 @@
+-- ====================================
+-- 📦 DESPERDÍCIO SEM LOTE (SQLite, execução local)
+-- ====================================
+-- Equivalente ao sql/supabase/007_estoque_desperdicio_orfao.sql.
+-- ====================================
+
+DROP TRIGGER IF EXISTS estoque_producao_delete;
+DROP TRIGGER IF EXISTS estoque_desperdicio_delete;
+DROP TRIGGER IF EXISTS estoque_desperdicio_update;
+
+-- O desperdício do lote excluído passa a contar no produto de cada registro
+CREATE TRIGGER estoque_producao_delete AFTER DELETE ON producao
+BEGIN
+    UPDATE estoque_produtos SET
+        quantidade_produzida = quantidade_produzida - COALESCE(OLD.quantidade_produzida, 0),
+        quantidade_desperdicada = quantidade_desperdicada
+            - COALESCE((SELECT quantidade_desperdicada FROM estoque_lotes WHERE id_producao = OLD.id), 0)
+    WHERE produto = OLD.produto;
+    INSERT INTO estoque_produtos (produto, quantidade_desperdicada)
+    SELECT produto, SUM(COALESCE(quantidade_desperdicada, 0)) FROM desperdicio
+    WHERE id_producao = OLD.id GROUP BY produto
+    ON CONFLICT (produto) DO UPDATE SET quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+    DELETE FROM estoque_lotes WHERE id_producao = OLD.id;
+    DELETE FROM estoque_produtos WHERE quantidade_produzida = 0 AND quantidade_desperdicada = 0;
+END;
+
+-- Sai do mesmo produto em que entrou: o do lote, ou o informado se não há lote
+CREATE TRIGGER estoque_desperdicio_delete AFTER DELETE ON desperdicio
+BEGIN
+    UPDATE estoque_produtos SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE produto = COALESCE((SELECT produto FROM estoque_lotes WHERE id_producao = OLD.id_producao), OLD.produto);
+    UPDATE estoque_lotes SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE id_producao = OLD.id_producao;
+    DELETE FROM estoque_produtos WHERE quantidade_produzida = 0 AND quantidade_desperdicada = 0;
+END;
+
+CREATE TRIGGER estoque_desperdicio_update AFTER UPDATE ON desperdicio
+BEGIN
+    UPDATE estoque_produtos SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE produto = COALESCE((SELECT produto FROM estoque_lotes WHERE id_producao = OLD.id_producao), OLD.produto);
+    UPDATE estoque_lotes SET quantidade_desperdicada = quantidade_desperdicada - COALESCE(OLD.quantidade_desperdicada, 0)
+    WHERE id_producao = OLD.id_producao;
+    INSERT INTO estoque_produtos (produto, quantidade_desperdicada)
+    VALUES (
+        COALESCE((SELECT produto FROM estoque_lotes WHERE id_producao = NEW.id_producao), NEW.produto),
+        COALESCE(NEW.quantidade_desperdicada, 0)
+    )
+    ON CONFLICT (produto) DO UPDATE SET quantidade_desperdicada = quantidade_desperdicada + excluded.quantidade_desperdicada;
+    UPDATE estoque_lotes SET quantidade_desperdicada = quantidade_desperdicada + COALESCE(NEW.quantidade_desperdicada, 0)
+    WHERE id_producao = NEW.id_producao;
+    DELETE FROM estoque_produtos WHERE quantidade_produzida = 0 AND quantidade_desperdicada = 0;
+END;
+
+-- Refaz os totais por produto: desfaz o resíduo deixado pelos triggers anteriores
+DELETE FROM estoque_produtos;
+INSERT INTO estoque_produtos (produto, quantidade_produzida, quantidade_desperdicada)
+SELECT produto, SUM(quantidade_produzida), SUM(quantidade_desperdicada)
+FROM (
+    SELECT produto, quantidade_produzida, quantidade_desperdicada FROM estoque_lotes
+    UNION ALL
+    SELECT d.produto, 0, COALESCE(d.quantidade_desperdicada, 0)
+    FROM desperdicio d LEFT JOIN producao p ON p.id = d.id_producao
+    WHERE p.id IS NULL
+)
+GROUP BY produto
+HAVING SUM(quantidade_produzida) <> 0 OR SUM(quantidade_desperdicada) <> 0;
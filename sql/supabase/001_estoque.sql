@@ -0,0 +1,115 @@
+-- ====================================
+-- 📦 LIVRO DE ESTOQUE (Supabase / Postgres)
+-- ====================================
+-- Saldos por lote (estoque_lotes) e por produto (estoque_produtos)
+-- mantidos por triggers em producao/desperdicio. As telas de Estoque e
+-- Painel leem só estas tabelas, sem somar o histórico a cada visita.
+-- O desperdício é atribuído ao lote pelo id_producao.
+-- Executar uma vez no SQL Editor do Supabase.
+-- ====================================
+
+create table if not exists estoque_lotes (
+    id_producao bigint primary key,
+    produto text not null,
+    cor text,
+    data_validade date,
+    quantidade_produzida integer not null default 0,
+    quantidade_desperdicada integer not null default 0,
+    estoque_atual integer generated always as (quantidade_produzida - quantidade_desperdicada) stored
+);
+create index if not exists estoque_lotes_produto_validade on estoque_lotes (produto, data_validade);
+
+create table if not exists estoque_produtos (
+    produto text primary key,
+    quantidade_produzida bigint not null default 0,
+    quantidade_desperdicada bigint not null default 0,
+    estoque_atual bigint generated always as (quantidade_produzida - quantidade_desperdicada) stored
+);
+
+-- Soma (ou subtrai) quantidades no total do produto
+create or replace function estoque_somar_produto(p_produto text, p_produzida bigint, p_desperdicada bigint)
+returns void language plpgsql security definer as $$
+begin
+    insert into estoque_produtos (produto, quantidade_produzida, quantidade_desperdicada)
+    values (p_produto, p_produzida, p_desperdicada)
+    on conflict (produto) do update set
+        quantidade_produzida = estoque_produtos.quantidade_produzida + excluded.quantidade_produzida,
+        quantidade_desperdicada = estoque_produtos.quantidade_desperdicada + excluded.quantidade_desperdicada;
+    delete from estoque_produtos
+    where produto = p_produto and quantidade_produzida = 0 and quantidade_desperdicada = 0;
+end;
+$$;
+
+create or replace function estoque_producao_trigger()
+returns trigger language plpgsql security definer as $$
+declare
+    v_desperdicada integer;
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        delete from estoque_lotes where id_producao = old.id
+        returning quantidade_desperdicada into v_desperdicada;
+        perform estoque_somar_produto(old.produto, -coalesce(old.quantidade_produzida, 0), -coalesce(v_desperdicada, 0));
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into estoque_lotes (id_producao, produto, cor, data_validade, quantidade_produzida, quantidade_desperdicada)
+        values (new.id, new.produto, new.cor, new.data_validade::date,
+                coalesce(new.quantidade_produzida, 0), coalesce(v_desperdicada, 0));
+        perform estoque_somar_produto(new.produto, coalesce(new.quantidade_produzida, 0), coalesce(v_desperdicada, 0));
+    end if;
+    return null;
+end;
+$$;
+
+-- Desperdício de um lote já excluído não altera nada: o lote levou seu saldo junto
+create or replace function estoque_desperdicio_trigger()
+returns trigger language plpgsql security definer as $$
+declare
+    v_produto text;
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        update estoque_lotes set quantidade_desperdicada = quantidade_desperdicada - coalesce(old.quantidade_desperdicada, 0)
+        where id_producao = old.id_producao
+        returning produto into v_produto;
+        if found then
+            perform estoque_somar_produto(v_produto, 0, -coalesce(old.quantidade_desperdicada, 0));
+        end if;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        update estoque_lotes set quantidade_desperdicada = quantidade_desperdicada + coalesce(new.quantidade_desperdicada, 0)
+        where id_producao = new.id_producao
+        returning produto into v_produto;
+        perform estoque_somar_produto(coalesce(v_produto, new.produto), 0, coalesce(new.quantidade_desperdicada, 0));
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists estoque_producao on producao;
+create trigger estoque_producao after insert or update or delete on producao
+    for each row execute function estoque_producao_trigger();
+
+drop trigger if exists estoque_desperdicio on desperdicio;
+create trigger estoque_desperdicio after insert or update or delete on desperdicio
+    for each row execute function estoque_desperdicio_trigger();
+
+-- Carga inicial a partir do histórico existente
+truncate estoque_lotes, estoque_produtos;
+
+insert into estoque_lotes (id_producao, produto, cor, data_validade, quantidade_produzida, quantidade_desperdicada)
+select p.id, p.produto, p.cor, p.data_validade::date, coalesce(p.quantidade_produzida, 0), coalesce(d.total, 0)
+from producao p
+left join (
+    select id_producao, sum(quantidade_desperdicada) as total from desperdicio group by id_producao
+) d on d.id_producao = p.id;
+
+insert into estoque_produtos (produto, quantidade_produzida, quantidade_desperdicada)
+select produto, sum(quantidade_produzida), sum(quantidade_desperdicada)
+from (
+    select produto, quantidade_produzida, quantidade_desperdicada from estoque_lotes
+    union all
+    -- desperdício sem lote correspondente continua contando no produto
+    select d.produto, 0, d.quantidade_desperdicada
+    from desperdicio d left join producao p on p.id = d.id_producao
+    where p.id is null
+) t
+group by produto;
@@ -0,0 +1,51 @@
+-- ====================================
+-- ♻️ REMARCAÇÃO EM LOTE (Supabase / Postgres)
+-- ====================================
+-- remarcar_lotes(itens, agora): cada item {"id", "quantidade", "dias_extra"}
+-- tira a quantidade do lote de origem e cria um lote novo com validade
+-- agora + dias_extra. Tudo numa única chamada e numa única transação:
+-- se algum item for inválido, nenhum lote é alterado.
+-- Depende de 001_estoque.sql (o saldo disponível vem de estoque_lotes).
+-- ====================================
+
+create or replace function remarcar_lotes(itens jsonb, agora timestamp default now())
+returns setof producao language plpgsql security definer as $$
+declare
+    v_item jsonb;
+    v_lote producao;
+    v_quantidade integer;
+    v_dias integer;
+    v_disponivel integer;
+begin
+    agora := date_trunc('second', agora);
+    for v_item in select * from jsonb_array_elements(itens) loop
+        v_quantidade := (v_item->>'quantidade')::integer;
+        v_dias := (v_item->>'dias_extra')::integer;
+
+        select * into v_lote from producao where id = (v_item->>'id')::bigint for update;
+        if not found then
+            raise exception 'Lote % não encontrado.', v_item->>'id';
+        end if;
+
+        select coalesce(
+            (select estoque_atual from estoque_lotes where id_producao = v_lote.id),
+            v_lote.quantidade_produzida
+        ) into v_disponivel;
+        if v_quantidade is null or v_quantidade < 1 or v_quantidade > v_disponivel then
+            raise exception 'Quantidade inválida para o lote % (disponível: %).', v_lote.id, v_disponivel;
+        end if;
+        if v_dias is null or v_dias < 1 then
+            raise exception 'Dias adicionais inválidos para o lote %.', v_lote.id;
+        end if;
+
+        update producao
+        set quantidade_produzida = quantidade_produzida - v_quantidade, data_remarcacao = agora
+        where id = v_lote.id;
+
+        return query
+        insert into producao (data_producao, produto, quantidade_produzida, cor, data_validade)
+        values (agora, v_lote.produto, v_quantidade, v_lote.cor, agora::date + v_dias)
+        returning *;
+    end loop;
+end;
+$$;
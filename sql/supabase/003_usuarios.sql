@@ -0,0 +1,9 @@
+-- ====================================
+-- 🔐 LOGIN POR ÍNDICE (Supabase / Postgres)
+-- ====================================
+-- O login busca um único usuário por usuarios.usuario = '<digitado em
+-- minúsculas>'. Normaliza os cadastros antigos e cria o índice único.
+-- ====================================
+
+update usuarios set usuario = lower(trim(usuario)) where usuario <> lower(trim(usuario));
+create unique index if not exists usuarios_usuario on usuarios (usuario);
@@ -0,0 +1,111 @@
+-- ====================================
+-- 📉 RESUMOS DIÁRIOS (Supabase / Postgres)
+-- ====================================
+-- Produzido/desperdiçado por (data, produto, cor) e desperdício por
+-- (data, produto, motivo), mantidos por triggers a cada insert/update.
+-- A tela de Análises lê só estas tabelas: um ano de tendência são
+-- algumas centenas de linhas, não o histórico inteiro.
+-- Exclusões NÃO descontam dos resumos: as linhas antigas podem ser
+-- arquivadas/apagadas e os totais do período continuam disponíveis.
+-- Executar uma vez no SQL Editor do Supabase (depois do 001).
+-- ====================================
+
+create table if not exists resumo_diario (
+    id bigint generated always as identity primary key,
+    data date not null,
+    produto text not null,
+    cor text not null default '',
+    quantidade_produzida bigint not null default 0,
+    quantidade_desperdicada bigint not null default 0,
+    unique (data, produto, cor)
+);
+
+create table if not exists resumo_motivos (
+    id bigint generated always as identity primary key,
+    data date not null,
+    produto text not null,
+    motivo text not null default '',
+    quantidade_desperdicada bigint not null default 0,
+    unique (data, produto, motivo)
+);
+
+create or replace function resumo_somar(p_data date, p_produto text, p_cor text, p_produzida bigint, p_desperdicada bigint)
+returns void language plpgsql security definer as $$
+begin
+    if p_data is null then
+        return;
+    end if;
+    insert into resumo_diario (data, produto, cor, quantidade_produzida, quantidade_desperdicada)
+    values (p_data, coalesce(p_produto, ''), coalesce(p_cor, ''), p_produzida, p_desperdicada)
+    on conflict (data, produto, cor) do update set
+        quantidade_produzida = resumo_diario.quantidade_produzida + excluded.quantidade_produzida,
+        quantidade_desperdicada = resumo_diario.quantidade_desperdicada + excluded.quantidade_desperdicada;
+end;
+$$;
+
+create or replace function resumo_somar_motivo(p_data date, p_produto text, p_motivo text, p_desperdicada bigint)
+returns void language plpgsql security definer as $$
+begin
+    if p_data is null then
+        return;
+    end if;
+    insert into resumo_motivos (data, produto, motivo, quantidade_desperdicada)
+    values (p_data, coalesce(p_produto, ''), coalesce(p_motivo, ''), p_desperdicada)
+    on conflict (data, produto, motivo) do update set
+        quantidade_desperdicada = resumo_motivos.quantidade_desperdicada + excluded.quantidade_desperdicada;
+end;
+$$;
+
+-- UPDATE (ex.: remarcação) = sai a linha antiga, entra a nova
+create or replace function resumo_producao_trigger()
+returns trigger language plpgsql security definer as $$
+begin
+    if tg_op = 'UPDATE' then
+        perform resumo_somar(old.data_producao::date, old.produto, old.cor, -coalesce(old.quantidade_produzida, 0), 0);
+    end if;
+    perform resumo_somar(new.data_producao::date, new.produto, new.cor, coalesce(new.quantidade_produzida, 0), 0);
+    return null;
+end;
+$$;
+
+create or replace function resumo_desperdicio_trigger()
+returns trigger language plpgsql security definer as $$
+begin
+    if tg_op = 'UPDATE' then
+        perform resumo_somar(old.data_desperdicio::date, old.produto, old.cor, 0, -coalesce(old.quantidade_desperdicada, 0));
+        perform resumo_somar_motivo(old.data_desperdicio::date, old.produto, old.motivo, -coalesce(old.quantidade_desperdicada, 0));
+    end if;
+    perform resumo_somar(new.data_desperdicio::date, new.produto, new.cor, 0, coalesce(new.quantidade_desperdicada, 0));
+    perform resumo_somar_motivo(new.data_desperdicio::date, new.produto, new.motivo, coalesce(new.quantidade_desperdicada, 0));
+    return null;
+end;
+$$;
+
+-- Sem "or delete": ver cabeçalho
+drop trigger if exists resumo_producao on producao;
+create trigger resumo_producao after insert or update on producao
+    for each row execute function resumo_producao_trigger();
+
+drop trigger if exists resumo_desperdicio on desperdicio;
+create trigger resumo_desperdicio after insert or update on desperdicio
+    for each row execute function resumo_desperdicio_trigger();
+
+-- Carga inicial a partir do histórico (só com os resumos vazios, para não duplicar)
+insert into resumo_diario (data, produto, cor, quantidade_produzida, quantidade_desperdicada)
+select data, produto, cor, sum(produzida), sum(desperdicada)
+from (
+    select data_producao::date as data, coalesce(produto, '') as produto, coalesce(cor, '') as cor,
+           coalesce(quantidade_produzida, 0) as produzida, 0 as desperdicada
+    from producao where data_producao is not null
+    union all
+    select data_desperdicio::date, coalesce(produto, ''), coalesce(cor, ''), 0, coalesce(quantidade_desperdicada, 0)
+    from desperdicio where data_desperdicio is not null
+) t
+where not exists (select 1 from resumo_diario)
+group by data, produto, cor;
+
+insert into resumo_motivos (data, produto, motivo, quantidade_desperdicada)
+select data_desperdicio::date, coalesce(produto, ''), coalesce(motivo, ''), sum(coalesce(quantidade_desperdicada, 0))
+from desperdicio
+where data_desperdicio is not null and not exists (select 1 from resumo_motivos)
+group by 1, 2, 3;
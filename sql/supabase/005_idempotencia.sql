@@ -0,0 +1,15 @@
+-- ====================================
+-- 📤 CHAVE DE IDEMPOTÊNCIA (Supabase / Postgres)
+-- ====================================
+-- A fila de escrita (fila.py) envia cada registro com uma chave única
+-- e reenvia o lote inteiro quando a resposta não chega. O insert usa
+-- "on conflict (chave_idempotencia) do nothing": o que já tinha
+-- chegado é ignorado em vez de duplicar. Linhas antigas ficam com a
+-- chave nula (nulos não conflitam no índice único).
+-- ====================================
+
+alter table producao add column if not exists chave_idempotencia text;
+create unique index if not exists producao_chave_idempotencia on producao (chave_idempotencia);
+
+alter table desperdicio add column if not exists chave_idempotencia text;
+create unique index if not exists desperdicio_chave_idempotencia on desperdicio (chave_idempotencia);
@@ -0,0 +1,10 @@
+-- ====================================
+-- 📦 LOTES ABERTOS (Supabase / Postgres)
+-- ====================================
+-- O app lê de estoque_lotes só os lotes com saldo (estoque_atual > 0),
+-- em páginas por id_producao. Este índice parcial contém apenas esses
+-- lotes: a leitura acompanha o estoque aberto, não o histórico inteiro.
+-- Depende de 001_estoque.sql.
+-- ====================================
+
+create index if not exists estoque_lotes_abertos on estoque_lotes (id_producao) where estoque_atual > 0;
@@ -0,0 +1,74 @@
+-- ====================================
+-- 📦 DESPERDÍCIO SEM LOTE (Supabase / Postgres)
+-- ====================================
+-- O 001_estoque.sql somava o desperdício sem lote no produto informado,
+-- mas ao excluir/alterar esse registro não subtraía de lugar nenhum:
+-- sobrava resíduo (negativo) em estoque_produtos. Agora o desperdício
+-- sai do mesmo produto em que entrou (o do lote, ou o informado se não
+-- há lote), e o lote excluído deixa seu desperdício no produto de cada
+-- registro, como na carga inicial. Depende de 001_estoque.sql.
+-- ====================================
+
+create or replace function estoque_producao_trigger()
+returns trigger language plpgsql security definer as $$
+declare
+    v_desperdicada integer;
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        delete from estoque_lotes where id_producao = old.id
+        returning quantidade_desperdicada into v_desperdicada;
+        perform estoque_somar_produto(old.produto, -coalesce(old.quantidade_produzida, 0), -coalesce(v_desperdicada, 0));
+    end if;
+    if tg_op = 'DELETE' then
+        -- Sem o lote, o desperdício que ficou conta no produto de cada registro
+        perform estoque_somar_produto(produto, 0, total)
+        from (
+            select produto, sum(coalesce(quantidade_desperdicada, 0)) as total
+            from desperdicio where id_producao = old.id group by produto
+        ) d;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into estoque_lotes (id_producao, produto, cor, data_validade, quantidade_produzida, quantidade_desperdicada)
+        values (new.id, new.produto, new.cor, new.data_validade::date,
+                coalesce(new.quantidade_produzida, 0), coalesce(v_desperdicada, 0));
+        perform estoque_somar_produto(new.produto, coalesce(new.quantidade_produzida, 0), coalesce(v_desperdicada, 0));
+    end if;
+    return null;
+end;
+$$;
+
+create or replace function estoque_desperdicio_trigger()
+returns trigger language plpgsql security definer as $$
+declare
+    v_produto text;
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        update estoque_lotes set quantidade_desperdicada = quantidade_desperdicada - coalesce(old.quantidade_desperdicada, 0)
+        where id_producao = old.id_producao
+        returning produto into v_produto;
+        perform estoque_somar_produto(coalesce(v_produto, old.produto), 0, -coalesce(old.quantidade_desperdicada, 0));
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        update estoque_lotes set quantidade_desperdicada = quantidade_desperdicada + coalesce(new.quantidade_desperdicada, 0)
+        where id_producao = new.id_producao
+        returning produto into v_produto;
+        perform estoque_somar_produto(coalesce(v_produto, new.produto), 0, coalesce(new.quantidade_desperdicada, 0));
+    end if;
+    return null;
+end;
+$$;
+
+-- Refaz os totais por produto: desfaz o resíduo deixado pelos triggers anteriores
+truncate estoque_produtos;
+
+insert into estoque_produtos (produto, quantidade_produzida, quantidade_desperdicada)
+select produto, sum(quantidade_produzida), sum(quantidade_desperdicada)
+from (
+    select produto, quantidade_produzida, quantidade_desperdicada from estoque_lotes
+    union all
+    select d.produto, 0, coalesce(d.quantidade_desperdicada, 0)
+    from desperdicio d left join producao p on p.id = d.id_producao
+    where p.id is null
+) t
+group by produto
+having sum(quantidade_produzida) <> 0 or sum(quantidade_desperdicada) <> 0;